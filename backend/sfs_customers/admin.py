@@ -1,11 +1,18 @@
 from django.contrib import admin
-from .models import Customer, LoyaltyCard
+from .models import Customer, LoyaltyCard, LoyaltyTransaction
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
     list_display = ['internal_id', 'full_name', 'email', 'phone', 'is_active']
     search_fields = ['first_name', 'last_name', 'email']
+    raw_id_fields = ['user']
 
 @admin.register(LoyaltyCard)
 class LoyaltyCardAdmin(admin.ModelAdmin):
-    list_display = ['card_number', 'customer', 'points_balance', 'is_active']
\ No newline at end of file
+    list_display = ['card_number', 'customer', 'points_balance', 'is_active']
+
+@admin.register(LoyaltyTransaction)
+class LoyaltyTransactionAdmin(admin.ModelAdmin):
+    list_display = ['card', 'kind', 'points', 'reference', 'created_at']
+    list_filter = ['kind']
+    search_fields = ['card__card_number', 'reference']
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SfsCustomersConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sfs_customers'
+
+    def ready(self):
+        from sfs_customers import signals  # noqa: F401
@@ -0,0 +1,79 @@
+# sfs_customers/cards.py
+"""Lecture des cartes fidélité scannées en caisse.
+
+La réponse au scan est compacte (client, carte, solde) et gardée dans le
+cache 'cards' : LRU en mémoire du processus par défaut, MAX_ENTRIES cartes
+récentes. Une absence coûte une seule requête (carte jointe au client).
+
+Les entrées sont supprimées après validation de toute transaction qui
+modifie une carte ou son client : signaux post_save / post_delete, et
+journal des points (loyalty.record), dont les UPDATE n'émettent pas de
+signal. Avec plusieurs workers, configurer CARDS_CACHE_BACKEND sur Redis ou
+Memcached pour partager l'invalidation ; sinon un autre worker peut servir
+un solde périmé jusqu'à CARDS_CACHE_TIMEOUT.
+"""
+from django.core.cache import caches
+from django.db import transaction
+
+from sfs_customers.models import LoyaltyCard
+
+
+def get_cache():
+    return caches['cards']
+
+
+def cache_key(card_number):
+    return f'card:{card_number}'
+
+
+def payload(card):
+    customer = card.customer
+    return {
+        'customer': {
+            'id': customer.pk,
+            'first_name': customer.first_name,
+            'last_name': customer.last_name,
+            'full_name': customer.full_name,
+        },
+        'loyalty_card': {
+            'id': card.pk,
+            'card_number': card.card_number,
+            'points_balance': card.points_balance,
+            'is_active': card.is_active,
+        },
+    }
+
+
+def lookup(card_number):
+    """Réponse au scan de card_number, None si la carte n'existe pas"""
+    cache = get_cache()
+    data = cache.get(cache_key(card_number))
+    if data is None:
+        card = (
+            LoyaltyCard.objects.select_related('customer')
+            .only(
+                'card_number', 'points_balance', 'is_active',
+                'customer__first_name', 'customer__last_name', 'customer__is_anonymized',
+            )
+            .filter(card_number=card_number).first()
+        )
+        if card is None:
+            return None
+        data = payload(card)
+        cache.set(cache_key(card_number), data)
+    return data
+
+
+def invalidate(card_numbers):
+    """Oublie les cartes après validation de la transaction en cours.
+
+    Supprimer plus tôt laisserait un scan concurrent remettre en cache
+    l'état d'avant la transaction.
+    """
+    keys = [cache_key(number) for number in card_numbers]
+    if keys:
+        transaction.on_commit(lambda: get_cache().delete_many(keys))
+
+
+def invalidate_customers(customer_ids):
+    invalidate(LoyaltyCard.objects.filter(customer_id__in=customer_ids).values_list('card_number', flat=True))
@@ -0,0 +1,150 @@
+# sfs_customers/loyalty.py
+"""Journal des points de fidélité.
+
+Chaque gain ou utilisation de points est une ligne de loyalty_transactions ;
+les compteurs de LoyaltyCard (solde, cumul gagné, cumul dépensé) en sont la
+somme, tenue à jour par UPDATE avec F() dans la même transaction. Plusieurs
+achats simultanés sur une carte partagée ne perdent donc aucun point, et
+recompute() peut à tout moment réaligner les compteurs sur le journal.
+"""
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from sfs_customers import cards, profiles
+from sfs_customers.models import LoyaltyCard, LoyaltyTransaction
+
+
+class InsufficientPoints(ValueError):
+    """Utilisation de points au-delà du solde de la carte"""
+    def __init__(self, card_ids):
+        self.card_ids = list(card_ids)
+        super().__init__("Solde insuffisant")
+
+
+def increment(field, deltas):
+    """field + {carte: variation}, cartes regroupées par valeur de variation"""
+    groups = {}
+    for pk, delta in deltas.items():
+        groups.setdefault(delta, []).append(pk)
+    if len(groups) == 1:
+        (delta, _), = groups.items()
+        return F(field) + delta
+    return Case(
+        *[When(pk__in=pks, then=F(field) + Value(delta)) for delta, pks in groups.items()],
+        default=F(field), output_field=IntegerField(),
+    )
+
+
+def record(transactions):
+    """Insère des LoyaltyTransaction et met à jour les cartes (1 INSERT, 1 UPDATE).
+
+    Une utilisation qui rendrait un solde négatif est refusée par le WHERE
+    de l'UPDATE : InsufficientPoints, rien n'est enregistré.
+    """
+    transactions = [entry for entry in transactions if entry.points]
+    if not transactions:
+        return transactions
+    balance, earned, spent = {}, {}, {}
+    for entry in transactions:
+        balance[entry.card_id] = balance.get(entry.card_id, 0) + entry.points
+        if entry.kind == 'EARN':
+            earned[entry.card_id] = earned.get(entry.card_id, 0) + entry.points
+        elif entry.kind == 'REDEEM':
+            spent[entry.card_id] = spent.get(entry.card_id, 0) - entry.points
+
+    queryset = LoyaltyCard.objects.filter(pk__in=balance)
+    debits = {pk: delta for pk, delta in balance.items() if delta < 0}
+    if debits:
+        guard = Q(pk__in=[pk for pk in balance if pk not in debits])
+        for pk, delta in debits.items():
+            guard |= Q(pk=pk, points_balance__gte=-delta)
+        queryset = queryset.filter(guard)
+    values = {'points_balance': increment('points_balance', balance), 'updated_at': timezone.now()}
+    if earned:
+        values['total_points_earned'] = increment('total_points_earned', {pk: earned.get(pk, 0) for pk in balance})
+    if spent:
+        values['total_points_spent'] = increment('total_points_spent', {pk: spent.get(pk, 0) for pk in balance})
+
+    with transaction.atomic():
+        if queryset.update(**values) != len(balance):
+            raise InsufficientPoints(sorted(debits))
+        LoyaltyTransaction.objects.bulk_create(transactions, batch_size=500)
+        forget(list(balance))
+    return transactions
+
+
+def forget(card_ids):
+    """Oublie les soldes en cache : scan en caisse (cards) et profil des titulaires (profiles)"""
+    rows = list(LoyaltyCard.objects.filter(pk__in=card_ids).values_list('card_number', 'customer__user_id'))
+    cards.invalidate([number for number, _ in rows])
+    profiles.invalidate([user_id for _, user_id in rows])
+
+
+def accrue(points_by_card, reference=''):
+    """Crédite {carte: points}"""
+    return record([
+        LoyaltyTransaction(card_id=pk, kind='EARN', points=points, reference=reference)
+        for pk, points in points_by_card.items()
+    ])
+
+
+def redeem(card, points, reference=''):
+    """Débite points de la carte, refusé au-delà du solde"""
+    if points <= 0:
+        raise ValueError("Le nombre de points doit être positif")
+    return record([LoyaltyTransaction(card_id=card.pk, kind='REDEEM', points=-points, reference=reference)])
+
+
+def ledger_totals():
+    """Compteurs d'une carte (OuterRef) recalculés depuis le journal"""
+    lines = LoyaltyTransaction.objects.filter(card=OuterRef('pk')).order_by().values('card')
+
+    def total(**filters):
+        return Coalesce(
+            Subquery(lines.filter(**filters).annotate(total=Sum('points')).values('total'), output_field=IntegerField()),
+            Value(0),
+        )
+
+    return {
+        'points_balance': total(),
+        'total_points_earned': total(kind='EARN'),
+        'total_points_spent': total(kind='REDEEM') * -1,
+    }
+
+
+def recompute(batch_size=1000):
+    """Réaligne les compteurs des cartes sur le journal, batch_size cartes par transaction.
+
+    Seules les cartes en écart sont verrouillées puis réécrites ; retourne
+    (cartes examinées, cartes corrigées).
+    """
+    checked = fixed = last = 0
+    while True:
+        pks = list(
+            LoyaltyCard.objects.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return checked, fixed
+        last = pks[-1]
+        checked += len(pks)
+        with transaction.atomic():
+            drifted = list(
+                LoyaltyCard.objects.filter(pk__in=pks)
+                .annotate(**{f'ledger_{field}': value for field, value in ledger_totals().items()})
+                .exclude(
+                    points_balance=F('ledger_points_balance'),
+                    total_points_earned=F('ledger_total_points_earned'),
+                    total_points_spent=F('ledger_total_points_spent'),
+                )
+                .values_list('pk', flat=True)
+            )
+            if not drifted:
+                continue
+            locked = LoyaltyCard.objects.filter(pk__in=drifted)
+            if connection.features.has_select_for_update:
+                # Les gains en cours sont attendus : l'UPDATE relit un journal à jour
+                list(locked.select_for_update().values_list('pk', flat=True))
+            fixed += locked.update(**ledger_totals(), updated_at=timezone.now())
+            forget(drifted)
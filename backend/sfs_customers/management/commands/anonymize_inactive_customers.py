@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from sfs_customers import retention
+
+
+class Command(BaseCommand):
+    help = ("Anonymise les clients sans achat depuis RGPD_DATA_RETENTION_DAYS jours (à planifier chaque nuit ; "
+            "une passe interrompue reprend à la suivante)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Clients par transaction')
+        parser.add_argument('--days', type=int, help=f'Durée de conservation, défaut : {settings.RGPD_DATA_RETENTION_DAYS}')
+        parser.add_argument('--limit', type=int, help='Clients au plus pour cette passe')
+        parser.add_argument('--pause', type=float, default=0, help='Secondes entre deux paquets')
+        parser.add_argument('--dry-run', action='store_true', help='Compte les clients concernés sans les anonymiser')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size doit être positif")
+        days = options['days']
+        pending = retention.pending(days=days)
+        self.stdout.write(f"{pending} clients inactifs depuis {retention.cutoff(days=days):%Y-%m-%d}")
+        if options['dry_run'] or not pending:
+            return
+        goal = min(pending, options['limit']) if options['limit'] is not None else pending
+        started = time.perf_counter()
+
+        def progress(total):
+            self.stdout.write(f"  {total}/{goal} anonymisés ({time.perf_counter() - started:.1f}s)")
+
+        count = retention.sweep(
+            batch_size=options['batch_size'], days=days, limit=options['limit'],
+            pause=options['pause'], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f"{count} clients anonymisés"))
@@ -0,0 +1,80 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from sfs_customers import cards
+from sfs_customers.models import Customer, LoyaltyCard
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    pick = lambda share: latencies[min(int(len(latencies) * share), len(latencies) - 1)] * 1000
+    return f"p50 {pick(0.50):.3f} ms, p99 {pick(0.99):.3f} ms, max {latencies[-1] * 1000:.3f} ms"
+
+
+class Command(BaseCommand):
+    help = ("Benchmark : latence du scan de carte fidélité (cache froid, cache chaud, "
+            "requête HTTP complète, ancienne recherche search_by_card)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=100000, help='Cartes de test créées puis supprimées')
+        parser.add_argument('--scans', type=int, default=20000)
+        parser.add_argument('--regulars', type=int, default=2000,
+                            help='Habitués : 80 %% des scans portent sur ces cartes')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:6].upper()
+        numbers = [f'BENCH{tag}{i:07d}' for i in range(options['cards'])]
+        self.stdout.write(f"Création de {len(numbers)} cartes...")
+        customers = Customer.objects.bulk_create([
+            Customer(
+                internal_id=f'B{tag}{i}', first_name='Bench', last_name=str(i),
+                email=f'bench-{tag}-{i}@bench.local', is_active=False,
+            )
+            for i in range(len(numbers))
+        ], batch_size=2000)
+        if customers[0].pk is None:
+            customers = list(Customer.objects.filter(internal_id__startswith=f'B{tag}').order_by('pk'))
+        LoyaltyCard.objects.bulk_create([
+            LoyaltyCard(customer=customer, card_number=number)
+            for customer, number in zip(customers, numbers)
+        ], batch_size=2000)
+
+        try:
+            rng = random.Random(0)
+            regulars = rng.sample(numbers, min(options['regulars'], len(numbers)))
+            scans = [
+                rng.choice(regulars) if rng.random() < 0.8 else rng.choice(numbers)
+                for _ in range(options['scans'])
+            ]
+            cards.get_cache().clear()
+            self.report('base de données', self.run(scans[:2000], cold=True))
+            self.report('cache (habitués)', self.run(scans, cold=False))
+            client = Client()
+            self.report('POST search_by_card', self.run(
+                scans[:2000], cold=False,
+                scan=lambda number: client.post('/api/customers/search_by_card/', {'card_number': number}),
+            ))
+            self.report('GET /api/customers/scan/', self.run(
+                scans[:5000], cold=False,
+                scan=lambda number: client.get(f'/api/customers/scan/{number}/'),
+            ))
+        finally:
+            Customer.objects.filter(internal_id__startswith=f'B{tag}').delete()
+
+    def run(self, scans, cold, scan=cards.lookup):
+        cache = cards.get_cache()
+        latencies = []
+        for number in scans:
+            if cold:
+                cache.delete(cards.cache_key(number))
+            started = time.perf_counter()
+            scan(number)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    def report(self, name, latencies):
+        self.stdout.write(f"{name:26} {len(latencies)} scans - {percentiles(latencies)}")
@@ -0,0 +1,106 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from sfs_customers import search
+from sfs_customers.models import Customer, CustomerSearchToken
+from verger.text import fold
+
+FIRST_NAMES = [
+    'Jean', 'Marie', 'Hélène', 'Jérôme', 'François', 'Zoé', 'Chloé', 'Léa', 'Noël', 'Gaëlle', 'Anaïs',
+    'Stéphane', 'Cédric', 'Amélie', 'Loïc', 'Benoît', 'Émilie', 'Thérèse', 'Josée', 'René', 'Pierre',
+    'Louis', 'Camille', 'Lucie', 'Hugo', 'Mathéo', 'Inès', 'Raphaël', 'Maëlys', 'Adèle',
+]
+LAST_NAMES = [
+    'Dupont', 'Dupuis', 'Lefèvre', 'Lefebvre', 'Martin', 'Bernard', 'Durand', 'Petit', 'Moreau', 'Girard',
+    'Rousseau', 'Mercier', 'Fournier', 'Lambert', 'Bonnet', 'François', 'Fontaine', 'Chevalier', 'Gauthier',
+    'Lemaître', 'Bréhéret', 'Crémieux', 'Desprès', 'Gagné', 'Hébert', 'Lévêque', 'Ménard', 'Pâris', 'Prévost',
+    'Régnier', 'Sénéchal', 'Théry', 'Vallée', 'Bœuf', 'Côté', 'Leroy', 'Roux', 'Blanc', 'Garnier', 'Faure',
+]
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    pick = lambda share: latencies[min(int(len(latencies) * share), len(latencies) - 1)] * 1000
+    return f"p50 {pick(0.50):.2f} ms, p99 {pick(0.99):.2f} ms, max {latencies[-1] * 1000:.2f} ms"
+
+
+class Command(BaseCommand):
+    help = ("Benchmark : recherche de clients, LIKE '%%q%%' (ancien SearchFilter) "
+            "contre index de mots par préfixe, sur des clients de test créés puis supprimés")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=500000)
+        parser.add_argument('--queries', type=int, default=300)
+        parser.add_argument('--limit', type=int, default=20, help='Résultats par recherche')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:6].upper()
+        rng = random.Random(0)
+        self.stdout.write(f"Création de {options['customers']} clients...")
+        started = time.perf_counter()
+        for start in range(0, options['customers'], 10000):
+            Customer.objects.bulk_create([
+                Customer(
+                    internal_id=f'B{tag}{i}', first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                    email=f'client{i}@{tag.lower()}.bench', phone=f'06{rng.randrange(10 ** 8):08d}',
+                )
+                for i in range(start, min(start + 10000, options['customers']))
+            ])
+        created = time.perf_counter() - started
+        customers = Customer.objects.filter(internal_id__startswith=f'B{tag}')
+        try:
+            started = time.perf_counter()
+            last = 0
+            while True:
+                batch = list(customers.filter(pk__gt=last).order_by('pk')[:5000])
+                if not batch:
+                    break
+                search.index(batch)
+                last = batch[-1].pk
+            self.stdout.write(f"créés en {created:.0f}s, indexés en {time.perf_counter() - started:.0f}s")
+
+            queries = self.queries(rng, options['queries'])
+            queryset = Customer.objects.filter(is_active=True, is_anonymized=False)
+            limit = options['limit']
+            self.report('LIKE %q% (avant)', queries, lambda query: list(self.like(queryset, query).order_by('-created_at', '-id')[:limit]))
+            self.report('index, filtre ?search=', queries,
+                        lambda query: list(search.filter_customers(queryset, query).order_by('-created_at', '-id')[:limit]))
+            self.report('index, classement', queries, lambda query: search.ranked(queryset, query, limit=limit))
+        finally:
+            CustomerSearchToken.objects.filter(customer__in=customers).delete()
+            # Par lots : une seule suppression en cascade dépasse les paramètres permis par SQLite
+            while customers.exists():
+                Customer.objects.filter(pk__in=list(customers.values_list('pk', flat=True)[:5000])).delete()
+
+    def queries(self, rng, count):
+        """Saisies en caisse : début de nom, nom complet sans accent, prénom + nom, téléphone"""
+        queries = []
+        for _ in range(count):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            queries.append(rng.choice([
+                last[:rng.randint(2, 4)],
+                fold(last),
+                f'{first} {last[:3]}',
+                f'06 {rng.randrange(100):02d} {rng.randrange(100):02d}',
+            ]))
+        return queries
+
+    def like(self, queryset, query):
+        # Ce que générait SearchFilter sur first_name, last_name et email
+        for term in query.split():
+            queryset = queryset.filter(
+                Q(first_name__icontains=term) | Q(last_name__icontains=term) | Q(email__icontains=term)
+            )
+        return queryset
+
+    def report(self, name, queries, run):
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            run(query)
+            latencies.append(time.perf_counter() - started)
+        self.stdout.write(f"{name:24} {len(queries)} recherches - {percentiles(latencies)}")
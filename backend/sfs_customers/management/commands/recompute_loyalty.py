@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from sfs_customers.loyalty import recompute
+
+
+class Command(BaseCommand):
+    help = "Recalcule soldes et cumuls des cartes fidélité depuis le journal des points (à planifier chaque nuit)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Cartes par transaction')
+
+    def handle(self, *args, **options):
+        checked, fixed = recompute(batch_size=options['batch_size'])
+        self.stdout.write(f"{checked} cartes vérifiées, {fixed} corrigées")
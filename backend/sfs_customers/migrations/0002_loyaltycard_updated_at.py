@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_customers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loyaltycard',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
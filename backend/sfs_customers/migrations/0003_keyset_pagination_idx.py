@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_customers', '0002_loyaltycard_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['created_at', 'id'], name='customers_created_id_idx'),
+        ),
+    ]
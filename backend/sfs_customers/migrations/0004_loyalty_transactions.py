@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_customers', '0003_keyset_pagination_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoyaltyTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('EARN', 'Gain'), ('REDEEM', 'Utilisation'), ('ADJUSTMENT', 'Ajustement')], max_length=20)),
+                ('points', models.IntegerField()),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='sfs_customers.loyaltycard')),
+            ],
+            options={
+                'db_table': 'loyalty_transactions',
+                'indexes': [models.Index(fields=['card', 'id'], name='loyalty_card_id_idx'), models.Index(fields=['reference'], name='loyalty_reference_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:41
+
+from django.db import migrations
+
+OPENING = 'OUVERTURE'
+
+
+def open_ledger(apps, schema_editor):
+    """Reprend les compteurs existants dans le journal, pour que recompute() les retrouve"""
+    LoyaltyCard = apps.get_model('sfs_customers', 'LoyaltyCard')
+    LoyaltyTransaction = apps.get_model('sfs_customers', 'LoyaltyTransaction')
+    entries = []
+    cards = LoyaltyCard.objects.values_list('pk', 'points_balance', 'total_points_earned', 'total_points_spent')
+    for pk, balance, earned, spent in cards.iterator(chunk_size=2000):
+        # Écart éventuel entre le solde et gagné - dépensé : ajustement
+        for kind, points in (('EARN', earned), ('REDEEM', -spent), ('ADJUSTMENT', balance - earned + spent)):
+            if points:
+                entries.append(LoyaltyTransaction(card_id=pk, kind=kind, points=points, reference=OPENING))
+        if len(entries) >= 2000:
+            LoyaltyTransaction.objects.bulk_create(entries)
+            entries = []
+    LoyaltyTransaction.objects.bulk_create(entries)
+
+
+def close_ledger(apps, schema_editor):
+    apps.get_model('sfs_customers', 'LoyaltyTransaction').objects.filter(reference=OPENING).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_customers', '0004_loyalty_transactions'),
+    ]
+
+    operations = [
+        migrations.RunPython(open_ledger, close_ledger),
+    ]
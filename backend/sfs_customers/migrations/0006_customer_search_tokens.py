@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_customers', '0005_loyalty_opening_balances'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50)),
+                ('rank', models.PositiveSmallIntegerField(default=1)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='sfs_customers.customer')),
+            ],
+            options={
+                'db_table': 'customer_search_tokens',
+                'indexes': [models.Index(fields=['token', 'customer'], name='customer_search_token_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.0.1 on 2026-10-18 18:21
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+# Copie figée de verger.text et sfs_customers.search.customer_tokens à la
+# date de la migration : le code de l'application peut évoluer depuis
+WORD = re.compile(r'[a-z0-9]+')
+LIGATURES = str.maketrans({'œ': 'oe', 'Œ': 'OE', 'æ': 'ae', 'Æ': 'AE', 'ß': 'ss'})
+MIN_TERM_LENGTH = 2
+NAME, CONTACT = 2, 1
+
+
+def fold(value):
+    value = unicodedata.normalize('NFKD', str(value or '').translate(LIGATURES))
+    return ''.join(char for char in value if not unicodedata.combining(char)).lower()
+
+
+def words(value):
+    return WORD.findall(fold(value))
+
+
+def customer_tokens(first_name, last_name, email, phone):
+    tokens = {}
+
+    def add(token, rank):
+        token = token[:50]
+        if len(token) >= MIN_TERM_LENGTH and tokens.get(token, 0) < rank:
+            tokens[token] = rank
+
+    for word in words(f'{first_name} {last_name}'):
+        add(word, NAME)
+    local = fold(email).split('@')[0]
+    for word in words(local):
+        add(word, CONTACT)
+    add(''.join(words(local)), CONTACT)
+    digits = ''.join(char for char in str(phone or '') if char.isdigit())
+    if len(digits) >= 4:
+        add(digits, CONTACT)
+        if digits.startswith('33'):
+            add('0' + digits[2:], CONTACT)
+    return tokens
+
+
+def backfill(apps, schema_editor):
+    Customer = apps.get_model('sfs_customers', 'Customer')
+    CustomerSearchToken = apps.get_model('sfs_customers', 'CustomerSearchToken')
+    last = 0
+    while True:
+        batch = list(
+            Customer.objects.filter(pk__gt=last, is_anonymized=False).order_by('pk')
+            .values_list('pk', 'first_name', 'last_name', 'email', 'phone')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        CustomerSearchToken.objects.bulk_create([
+            CustomerSearchToken(customer_id=pk, token=token, rank=rank)
+            for pk, *fields in batch
+            for token, rank in customer_tokens(*fields).items()
+        ])
+        last = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_customers', '0006_customer_search_tokens'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
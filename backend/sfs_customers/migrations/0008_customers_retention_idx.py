@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_customers', '0007_customer_search_backfill'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(condition=models.Q(('is_anonymized', False)), fields=['last_purchase_date'], name='customers_retention_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(condition=models.Q(('is_anonymized', False), ('last_purchase_date__isnull', True)), fields=['created_at'], name='customers_never_bought_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:06
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def backfill(apps, schema_editor):
+    """Lie chaque client au compte de même e-mail, comme le faisait /customers/me/"""
+    Customer = apps.get_model('sfs_customers', 'Customer')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    last = 0
+    while True:
+        batch = list(
+            Customer.objects.filter(pk__gt=last, user__isnull=True, is_anonymized=False).order_by('pk')
+            .values_list('pk', 'email')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        last = batch[-1][0]
+        users = {}
+        # Plusieurs comptes pour un même e-mail : le plus ancien l'emporte
+        for pk, email in (
+            User.objects.filter(email__in={email for _, email in batch if email}, customer__isnull=True)
+            .order_by('-pk').values_list('pk', 'email')
+        ):
+            users[email] = pk
+        Customer.objects.bulk_update(
+            [Customer(pk=pk, user_id=users[email]) for pk, email in batch if email in users],
+            ['user'], batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_customers', '0009_customer_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
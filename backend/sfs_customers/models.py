@@ -22,11 +22,27 @@ class Customer(models.Model):
     newsletter_consent = models.BooleanField(default=False)
     newsletter_consent_date = models.DateTimeField(null=True, blank=True)
     last_purchase_date = models.DateTimeField(null=True, blank=True)
+    # Compte de la boutique en ligne (inscription), None pour un client de caisse
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='customer',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'customers'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='customers_created_id_idx'),
+            # Recherche des clients inactifs (sfs_customers.retention), hors clients déjà anonymisés
+            models.Index(
+                fields=['last_purchase_date'], name='customers_retention_idx',
+                condition=models.Q(is_anonymized=False),
+            ),
+            models.Index(
+                fields=['created_at'], name='customers_never_bought_idx',
+                condition=models.Q(is_anonymized=False, last_purchase_date__isnull=True),
+            ),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.internal_id:
@@ -64,6 +80,7 @@ class LoyaltyCard(models.Model):
     total_points_spent = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
     issued_date = models.DateField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'loyalty_cards'
@@ -71,23 +88,50 @@ class LoyaltyCard(models.Model):
     def __str__(self):
         return f"Carte {self.card_number}"
     
-    def add_points(self, amount_spent):
-    # On s'assure que settings.LOYALTY_POINTS_MULTIPLIER est importé
-        from django.conf import settings
-    
-    # Calcul des points (conversion explicite pour éviter les erreurs de type)
-    # Si amount_spent est 15.50€, points deviendra 15 (car IntegerField)
-        points = int(Decimal(str(amount_spent)) * Decimal(str(settings.LOYALTY_POINTS_MULTIPLIER)))
+    @staticmethod
+    def points_for_amount(amount_spent):
+        # Calcul des points (conversion explicite pour éviter les erreurs de type)
+        # Si amount_spent est 15.50€, points deviendra 15 (car IntegerField)
+        return int(Decimal(str(amount_spent)) * Decimal(str(settings.LOYALTY_POINTS_MULTIPLIER)))
     
-        self.points_balance += points
-        self.total_points_earned += points
-        self.save()
+    def add_points(self, amount_spent, reference=''):
+        from sfs_customers import loyalty
+        points = self.points_for_amount(amount_spent)
+        loyalty.accrue({self.pk: points}, reference=reference)
+        self.refresh_from_db(fields=['points_balance', 'total_points_earned', 'total_points_spent'])
         return points
     
-    def redeem_points(self, points):
-        if points > self.points_balance:
-            raise ValueError("Solde insuffisant")
-        self.points_balance -= points
-        self.total_points_spent += points
-        self.save()
+    def redeem_points(self, points, reference=''):
+        from sfs_customers import loyalty
+        loyalty.redeem(self, points, reference=reference)
+        self.refresh_from_db(fields=['points_balance', 'total_points_earned', 'total_points_spent'])
         return (points / settings.LOYALTY_DISCOUNT_THRESHOLD) * 10
+
+class LoyaltyTransaction(models.Model):
+    """Journal des points : le solde d'une carte est la somme de ses lignes"""
+    KINDS = [('EARN', 'Gain'), ('REDEEM', 'Utilisation'), ('ADJUSTMENT', 'Ajustement')]
+    
+    card = models.ForeignKey(LoyaltyCard, on_delete=models.CASCADE, related_name='transactions')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    # Signé : positif pour un gain, négatif pour une utilisation
+    points = models.IntegerField()
+    reference = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'loyalty_transactions'
+        indexes = [
+            models.Index(fields=['card', 'id'], name='loyalty_card_id_idx'),
+            models.Index(fields=['reference'], name='loyalty_reference_idx'),
+        ]
+
+class CustomerSearchToken(models.Model):
+    """Mot replié (nom, e-mail, téléphone) d'un client, pour la recherche par préfixe"""
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=50)
+    # 2 pour le nom et le prénom, 1 pour l'e-mail et le téléphone
+    rank = models.PositiveSmallIntegerField(default=1)
+    
+    class Meta:
+        db_table = 'customer_search_tokens'
+        indexes = [models.Index(fields=['token', 'customer'], name='customer_search_token_idx')]
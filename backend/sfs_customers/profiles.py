@@ -0,0 +1,84 @@
+# sfs_customers/profiles.py
+"""Profil de l'utilisateur connecté (/customers/me/), appelé à chaque page de la boutique.
+
+Le profil (compte, client lié par Customer.user, carte fidélité) est lu en
+une requête jointe puis gardé dans le cache 'profiles', par utilisateur.
+Il est oublié après validation de toute transaction qui modifie le compte,
+son client ou sa carte : signaux post_save / post_delete, journal des
+points (loyalty.record) et anonymisation en masse (retention), dont les
+UPDATE n'émettent pas de signal. Comme pour 'cards', configurer
+PROFILES_CACHE_BACKEND sur Redis ou Memcached avec plusieurs workers.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+
+from sfs_customers.models import Customer
+
+
+def get_cache():
+    return caches['profiles']
+
+
+def cache_key(user_id):
+    return f'me:{user_id}'
+
+
+def payload(user):
+    data = {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name or '',
+        'last_name': user.last_name or '',
+        'is_staff': user.is_staff,
+        'is_superuser': user.is_superuser,
+        'is_active': user.is_active,
+    }
+    customer = getattr(user, 'customer', None)
+    if customer is None or customer.is_anonymized:
+        return data
+    data.update({
+        'customer_id': customer.id,
+        'phone': customer.phone,
+        'address': customer.address_line1,
+        'postal_code': customer.postal_code,
+        'city': customer.city,
+    })
+    card = getattr(customer, 'loyalty_card', None)
+    if card is not None:
+        data['loyalty_card'] = {
+            'card_number': card.card_number,
+            'points_balance': float(card.points_balance),
+            'is_active': card.is_active,
+        }
+    return data
+
+
+def me(user_id):
+    """Profil de l'utilisateur user_id, None s'il n'existe pas"""
+    cache = get_cache()
+    data = cache.get(cache_key(user_id))
+    if data is None:
+        user = (
+            get_user_model().objects.select_related('customer__loyalty_card')
+            .filter(pk=user_id).first()
+        )
+        if user is None:
+            return None
+        data = payload(user)
+        cache.set(cache_key(user_id), data)
+    return data
+
+
+def invalidate(user_ids):
+    """Oublie les profils après validation de la transaction en cours (voir cards.invalidate)"""
+    keys = [cache_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        transaction.on_commit(lambda: get_cache().delete_many(keys))
+
+
+def invalidate_customers(customer_ids):
+    invalidate(
+        Customer.objects.filter(pk__in=customer_ids, user__isnull=False).values_list('user_id', flat=True)
+    )
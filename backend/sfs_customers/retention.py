@@ -0,0 +1,107 @@
+# sfs_customers/retention.py
+"""Durée de conservation RGPD : anonymisation des clients inactifs.
+
+Un client est inactif quand son dernier achat (à défaut, sa création)
+remonte à plus de RGPD_DATA_RETENTION_DAYS jours. Ils sont trouvés par les
+index partiels customers_retention_idx et customers_never_bought_idx
+(clients non anonymisés seulement) et anonymisés par paquets : un UPDATE
+ensembliste par paquet, dans sa propre transaction, pour ne bloquer les
+caisses que quelques millisecondes.
+
+Une passe interrompue reprend d'elle-même : les clients déjà anonymisés
+sortent de l'index, la passe suivante repart des restants. L'UPDATE
+revérifie l'inactivité, un client qui vient d'acheter est épargné.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
+
+from sfs_customers import cards, profiles
+from sfs_customers.models import Customer, CustomerSearchToken
+
+
+def cutoff(now=None, days=None):
+    """Date avant laquelle un client sans achat est inactif"""
+    days = settings.RGPD_DATA_RETENTION_DAYS if days is None else days
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def inactive(before):
+    """Clients à anonymiser, par critère et sa clé de parcours : (dernier achat, jamais acheté)"""
+    customers = Customer.objects.filter(is_anonymized=False)
+    return [
+        ('last_purchase_date', customers.filter(last_purchase_date__lt=before)),
+        ('created_at', customers.filter(last_purchase_date__isnull=True, created_at__lt=before)),
+    ]
+
+
+def anonymized_values(now):
+    """Mêmes valeurs que Customer.anonymize, en expressions SQL"""
+    return {
+        'first_name': Value('ANONYME'),
+        'last_name': Concat(Value('CLIENT_'), Substr('internal_id', 1, 8)),
+        'email': Concat(Value('anonymized_'), F('internal_id'), Value('@deleted.local')),
+        'phone': Value(''),
+        'address_line1': Value(''),
+        'postal_code': Value(''),
+        'city': Value(''),
+        'is_anonymized': Value(True),
+        'is_active': Value(False),
+        'updated_at': Value(now),
+    }
+
+
+def pending(now=None, days=None):
+    """Nombre de clients à anonymiser"""
+    return sum(queryset.count() for _, queryset in inactive(cutoff(now, days)))
+
+
+def anonymize(queryset, pks, now):
+    """Anonymise les clients pks encore dans queryset (1 UPDATE) ; retourne leur nombre.
+
+    Les UPDATE n'émettant pas de signal, l'index de recherche et les caches
+    des cartes et des profils sont nettoyés ici.
+    """
+    with transaction.atomic():
+        count = queryset.filter(pk__in=pks).update(**anonymized_values(now))
+        if count:
+            done = list(Customer.objects.filter(pk__in=pks, is_anonymized=True).values_list('pk', flat=True))
+            CustomerSearchToken.objects.filter(customer_id__in=done).delete()
+            cards.invalidate_customers(done)
+            profiles.invalidate_customers(done)
+    return count
+
+
+def sweep(batch_size=500, now=None, days=None, limit=None, pause=0, progress=None):
+    """Anonymise les clients inactifs, batch_size par transaction.
+
+    limit borne le nombre de clients d'une passe (les suivants attendent la
+    passe d'après), pause (secondes) laisse la base aux caisses entre deux
+    paquets, progress(total) est appelé après chaque paquet. Retourne le
+    nombre de clients anonymisés.
+    """
+    now = now or timezone.now()
+    total = 0
+    for key, queryset in inactive(cutoff(now, days)):
+        # Parcours par clé : sous PostgreSQL, les entrées des clients déjà
+        # anonymisés restent dans l'index jusqu'au VACUUM, repartir du début
+        # les relirait à chaque paquet. key >= position suffit : les clients
+        # traités (anonymisés ou épargnés par un achat) ne correspondent plus.
+        remaining = queryset
+        while limit is None or total < limit:
+            size = batch_size if limit is None else min(batch_size, limit - total)
+            rows = list(remaining.order_by(key).values_list(key, 'pk')[:size])
+            if not rows:
+                break
+            remaining = queryset.filter(**{f'{key}__gte': rows[-1][0]})
+            total += anonymize(queryset, [pk for _, pk in rows], now)
+            if progress is not None:
+                progress(total)
+            if pause:
+                time.sleep(pause)
+    return total
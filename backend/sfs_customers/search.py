@@ -0,0 +1,156 @@
+# sfs_customers/search.py
+"""Recherche de clients par préfixe, casse et accents repliés.
+
+Chaque client a ses mots indexés dans customer_search_tokens (nom, prénom,
+e-mail, téléphone). Un terme de recherche devient un intervalle sur l'index
+(token, customer) : « dup » cherche token >= 'dup' AND token < 'duq', ce que
+SQLite comme PostgreSQL servent par l'index, là où LIKE '%dup%' parcourt
+toute la table. Chaque terme doit correspondre au début d'un mot ; un mot
+entier compte double, et le nom plus que l'e-mail ou le téléphone.
+
+L'index est tenu à jour à l'enregistrement d'un client (signal post_save) ;
+rebuild() le reconstruit après un import en masse.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Value, When
+
+from sfs_customers.models import Customer, CustomerSearchToken
+from verger.text import fold, words
+
+MIN_TERM_LENGTH = 2
+MAX_TERMS = 4
+# Clients classés au plus par recherche
+CANDIDATES = 500
+NAME, CONTACT = 2, 1
+
+
+def customer_tokens(first_name, last_name, email, phone):
+    """{mot: rang} d'un client"""
+    tokens = {}
+
+    def add(token, rank):
+        token = token[:50]
+        if len(token) >= MIN_TERM_LENGTH and tokens.get(token, 0) < rank:
+            tokens[token] = rank
+
+    for word in words(f'{first_name} {last_name}'):
+        add(word, NAME)
+    local = fold(email).split('@')[0]
+    for word in words(local):
+        add(word, CONTACT)
+    add(''.join(words(local)), CONTACT)
+    digits = ''.join(char for char in str(phone or '') if char.isdigit())
+    if len(digits) >= 4:
+        add(digits, CONTACT)
+        if digits.startswith('33'):
+            # +33 6 12 ... se cherche aussi en 06 12 ...
+            add('0' + digits[2:], CONTACT)
+    return tokens
+
+
+def index(customers):
+    """(Ré)indexe une liste de clients : 1 DELETE, 1 INSERT groupé.
+
+    Les clients anonymisés ne sont pas indexés : leurs anciens mots,
+    données personnelles, disparaissent de l'index.
+    """
+    rows = [
+        CustomerSearchToken(customer_id=customer.pk, token=token, rank=rank)
+        for customer in customers if not customer.is_anonymized
+        for token, rank in customer_tokens(customer.first_name, customer.last_name, customer.email, customer.phone).items()
+    ]
+    with transaction.atomic():
+        CustomerSearchToken.objects.filter(customer__in=[customer.pk for customer in customers]).delete()
+        CustomerSearchToken.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
+
+
+def rebuild(batch_size=2000):
+    """Réindexe tous les clients, batch_size par transaction ; retourne le nombre de clients"""
+    fields = ['pk', 'first_name', 'last_name', 'email', 'phone', 'is_anonymized']
+    count = last = 0
+    while True:
+        batch = list(Customer.objects.filter(pk__gt=last).order_by('pk').only(*fields)[:batch_size])
+        if not batch:
+            return count
+        index(batch)
+        count += len(batch)
+        last = batch[-1].pk
+
+
+def terms(query):
+    """Termes repliés de la recherche (les plus longs d'abord, plus sélectifs)"""
+    query = str(query)
+    if not any(char.isalpha() for char in query):
+        # Numéro de téléphone saisi avec espaces ou points : un seul terme
+        digits = ''.join(char for char in query if char.isdigit())
+        if query.strip().startswith('+33'):
+            digits = '0' + digits[2:]
+        return [digits] if len(digits) >= MIN_TERM_LENGTH else []
+    found = {word for word in words(query) if len(word) >= MIN_TERM_LENGTH}
+    return sorted(found, key=len, reverse=True)[:MAX_TERMS]
+
+
+def prefix(term):
+    """Mots commençant par term, en intervalle sur l'index"""
+    return Q(token__gte=term, token__lt=term[:-1] + chr(ord(term[-1]) + 1))
+
+
+def filter_customers(queryset, query):
+    """Clients de queryset dont chaque terme commence un mot ; aucun si pas de terme"""
+    found = terms(query)
+    if not found:
+        return queryset.none()
+    for term in found:
+        queryset = queryset.filter(pk__in=CustomerSearchToken.objects.filter(prefix(term)).values('customer_id'))
+    return queryset
+
+
+def ranked(queryset, query, limit=20):
+    """Les limit meilleurs clients de queryset pour query, du plus pertinent au moins pertinent.
+
+    Temps borné : seuls CANDIDATES clients sont classés, pris sur le terme le
+    plus sélectif dans l'ordre de l'index (mots entiers d'abord, puis les
+    compléments les plus courts). Un nom très courant ne fait donc pas
+    classer des dizaines de milliers de clients.
+    """
+    found = terms(query)
+    if not found:
+        return []
+    # Sélectivité de chaque terme, comptée au plus jusqu'à CANDIDATES + 1
+    sizes = {term: CustomerSearchToken.objects.filter(prefix(term))[:CANDIDATES + 1].count() for term in found}
+    driver = min(found, key=lambda term: sizes[term])
+    candidates = (
+        CustomerSearchToken.objects.filter(prefix(driver))
+        .order_by('token', 'customer_id').values_list('customer_id', flat=True)[:CANDIDATES]
+    )
+    # Restriction à queryset (clients actifs...) par clé primaire, sur les seuls candidats
+    candidates = list(queryset.filter(pk__in=list(candidates)).values_list('pk', flat=True))
+
+    condition = Q()
+    for term in found:
+        condition |= prefix(term)
+    # Score d'un terme : rang du meilleur mot trouvé, doublé pour un mot entier
+    scores = {
+        f'term_{position}': Max(Case(
+            When(token=term, then=F('rank') * 2),
+            When(prefix(term), then=F('rank')),
+            default=Value(0), output_field=IntegerField(),
+        ))
+        for position, term in enumerate(found)
+    }
+    best = list(
+        CustomerSearchToken.objects.filter(condition, customer_id__in=candidates)
+        .order_by().values('customer_id').annotate(**scores)
+        .filter(**{f'{name}__gt': 0 for name in scores})
+        .annotate(score=sum((F(name) for name in scores), Value(0)))
+        .order_by('-score', 'customer_id').values_list('customer_id', flat=True)[:limit]
+    )
+    if len(best) < limit and sizes[driver] > CANDIDATES:
+        # Candidats tronqués et trop peu de résultats : on complète sans classement
+        best += list(
+            filter_customers(queryset, query).exclude(pk__in=best)
+            .values_list('pk', flat=True)[:limit - len(best)]
+        )
+    customers = queryset.in_bulk(best)
+    return [customers[pk] for pk in best if pk in customers]
@@ -0,0 +1,39 @@
+# sfs_customers/signals.py
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from sfs_customers import cards, profiles, search
+from sfs_customers.models import Customer, LoyaltyCard
+
+
+@receiver([post_save, post_delete], sender=LoyaltyCard, dispatch_uid='cards_card')
+def invalidate_card(sender, instance, **kwargs):
+    cards.invalidate([instance.card_number])
+
+
+@receiver(post_save, sender=Customer, dispatch_uid='search_customer')
+def index_customer(sender, instance, **kwargs):
+    search.index([instance])
+
+
+@receiver(post_save, sender=Customer, dispatch_uid='cards_customer')
+def invalidate_customer(sender, instance, created, **kwargs):
+    # Nom affiché au scan (anonymisation comprise) ; un nouveau client n'a pas encore de carte
+    if not created:
+        cards.invalidate_customers([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL, dispatch_uid='profiles_user')
+def invalidate_user_profile(sender, instance, **kwargs):
+    profiles.invalidate([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Customer, dispatch_uid='profiles_customer')
+def invalidate_customer_profile(sender, instance, **kwargs):
+    profiles.invalidate([instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=LoyaltyCard, dispatch_uid='profiles_card')
+def invalidate_card_profile(sender, instance, **kwargs):
+    profiles.invalidate_customers([instance.customer_id])
@@ -1,21 +1,41 @@
 # API COMPLETE - Serializers et Views
 from rest_framework import serializers, viewsets, status, filters
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
+import hashlib
+from decimal import Decimal
+import django_filters
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db import transaction
+from django.db import DatabaseError, connection, transaction
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Max, Prefetch
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.utils import timezone
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 
+from sfs_products import catalogue
+from sfs_products import search as product_search
 from sfs_products.models import Product, ProductCategory
-from sfs_inventory.models import Stock, StockLocation, StockMovement
+from sfs_inventory.models import Stock, StockAlert, StockLocation, StockMovement
+from sfs_inventory import delta, history, intake
+from sfs_inventory.ledger import InsufficientStock
+from sfs_customers import cards, profiles
+from sfs_customers import search as customer_search
 from sfs_customers.models import Customer, LoyaltyCard
 from sfs_sales.models import Sale, SaleLine, DailyReport
+from sfs_sales.checkout import cancel_order, checkout, confirm_order, settle
+from sfs_sales import sync as sales_sync
+from sfs_sales.closing import close_days
+from sfs_sales.reporting import can_use_rollups, day_range, parse_bound, rollup_statistics, sales_statistics, top_products
 from django.contrib.auth import get_user_model
 
 
 User = get_user_model()  
+ALERTS_PAGE_SIZE = 200
+SEARCH_MAX_RESULTS = 50
 # === PRODUCTS SERIALIZERS ===
 class ProductCategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -50,11 +70,33 @@ class StockSerializer(serializers.ModelSerializer):
                   'quantity', 'reserved_quantity', 'available_quantity', 
                   'low_stock_threshold', 'is_low_stock', 'last_updated']
 
+class StockAlertSerializer(serializers.ModelSerializer):
+    product = serializers.IntegerField(source='stock.product_id', read_only=True)
+    product_name = serializers.CharField(source='stock.product.name', read_only=True)
+    location = serializers.IntegerField(source='stock.location_id', read_only=True)
+    location_name = serializers.CharField(source='stock.location.name', read_only=True)
+    
+    class Meta:
+        model = StockAlert
+        fields = ['id', 'stock', 'product', 'product_name', 'location', 'location_name',
+                  'kind', 'available_quantity', 'threshold', 'created_at']
+
 class StockMovementSerializer(serializers.ModelSerializer):
     class Meta:
         model = StockMovement
         fields = ['id', 'stock', 'movement_type', 'quantity', 'reference', 'note', 'created_at']
 
+class StockAsOfSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    location_name = serializers.CharField(source='location.name', read_only=True)
+    quantity_as_of = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    as_of_source = serializers.CharField(read_only=True)
+    
+    class Meta:
+        model = Stock
+        fields = ['id', 'product', 'product_name', 'location', 'location_name',
+                  'quantity', 'quantity_as_of', 'as_of_source']
+
 # === CUSTOMERS SERIALIZERS ===
 class CustomerSerializer(serializers.ModelSerializer):
     full_name = serializers.CharField(read_only=True)
@@ -76,7 +118,43 @@ class LoyaltyCardSerializer(serializers.ModelSerializer):
                   'points_balance', 'total_points_earned', 'is_active']
 
 # === SALES SERIALIZERS ===
+def prefetch_sale_relations(sales_data):
+    """Précharge produits, lieux et clients d'un lot de ventes (1 requête par modèle)"""
+    ids = {Product: set(), StockLocation: set(), Customer: set()}
+    
+    def add(model, value):
+        try:
+            ids[model].add(int(value))
+        except (TypeError, ValueError):
+            pass
+    
+    for sale_data in sales_data:
+        if not hasattr(sale_data, 'get'):
+            continue
+        add(StockLocation, sale_data.get('location'))
+        add(Customer, sale_data.get('customer'))
+        lines = sale_data.get('lines')
+        for line in lines if isinstance(lines, list) else []:
+            if hasattr(line, 'get'):
+                add(Product, line.get('product'))
+    return {model: model.objects.in_bulk(pks) for model, pks in ids.items()}
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Clé étrangère lue dans context['prefetched'] quand les objets ont été préchargés"""
+    def to_internal_value(self, data):
+        objects = self.context.get('prefetched', {}).get(self.get_queryset().model)
+        if objects is None:
+            return super().to_internal_value(data)
+        try:
+            obj = objects.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
 class SaleLineSerializer(serializers.ModelSerializer):
+    product = PrefetchedPrimaryKeyRelatedField(queryset=Product.objects.all())
     product_name = serializers.CharField(source='product.name', read_only=True)
     line_total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     
@@ -98,62 +176,37 @@ class SaleSerializer(serializers.ModelSerializer):
     
     def get_customer_name(self, obj):
         return obj.customer.full_name if obj.customer else "Client anonyme"
+    
+    def validate_status(self, value):
+        # Paiement, sorties de stock, points et agrégats : seule l'action confirm les enchaîne
+        if self.instance is not None and self.instance.status == 'PENDING' and value not in ('PENDING', 'CANCELLED'):
+            raise serializers.ValidationError("Une commande en attente se confirme via l'action confirm")
+        return value
 
 class SaleCreateSerializer(serializers.ModelSerializer):
+    location = PrefetchedPrimaryKeyRelatedField(queryset=StockLocation.objects.all())
+    customer = PrefetchedPrimaryKeyRelatedField(queryset=Customer.objects.all(), required=False, allow_null=True)
     lines = SaleLineSerializer(many=True)
     
     class Meta:
         model = Sale
-        fields = ['channel', 'location', 'customer', 'payment_method', 'lines', 'offline_created_at']
+        fields = ['id', 'sale_number', 'channel', 'location', 'customer', 'payment_method', 'lines',
+                  'offline_created_at', 'status', 'is_paid', 'total']
+        # Le client web confirme ou annule sa commande en attente avec id
+        read_only_fields = ['status', 'is_paid', 'total']
+    
+    def to_internal_value(self, data):
+        # Tout le panier en une requête par modèle (déjà fait par sync pour un lot)
+        if 'prefetched' not in self.context:
+            self.context['prefetched'] = prefetch_sale_relations([data])
+        return super().to_internal_value(data)
     
-    @transaction.atomic
     def create(self, validated_data):
         lines_data = validated_data.pop('lines')
-        sale = Sale.objects.create(
-            **validated_data,
-            subtotal=0,
-            vat_amount=0,
-            total=0,
-            is_paid=True,
-            status="COMPLETED"
-        )   
-        subtotal = vat_amount = 0
-        for line_data in lines_data:
-            product = line_data['product']
-            if 'unit_price' not in line_data:
-                line_data['unit_price'] = product.base_price
-            if 'vat_rate' not in line_data:
-                line_data['vat_rate'] = product.vat_rate
-            
-            line = SaleLine.objects.create(sale=sale, **line_data)
-            subtotal += line.line_total
-            vat_amount += line.vat_amount
-            
-            # Décrémenter stock
-            try:
-                stock = Stock.objects.get(product=product, location=sale.location)
-                StockMovement.objects.create(
-                    stock=stock, movement_type='OUT', quantity=line.quantity,
-                    reference=sale.sale_number, note=f"Vente {sale.channel}"
-                )
-            except Stock.DoesNotExist:
-                pass
-        
-        sale.subtotal = subtotal
-        sale.vat_amount = vat_amount
-        sale.total = subtotal + vat_amount
-        sale.save()
-        
-        # Points fidélité
-        if sale.customer and sale.is_paid:
-            try:
-                sale.customer.loyalty_card.add_points(float(sale.total))
-                sale.customer.last_purchase_date = sale.created_at
-                sale.customer.save()
-            except:
-                pass
-        
-        return sale
+        try:
+            return checkout(lines_data, **validated_data)
+        except InsufficientStock as exc:
+            raise serializers.ValidationError({'lines': str(exc)})
 
 class DailyReportSerializer(serializers.ModelSerializer):
     location_name = serializers.CharField(source='location.name', read_only=True)
@@ -166,46 +219,260 @@ class DailyReportSerializer(serializers.ModelSerializer):
                   'actual_cash', 'cash_difference', 'is_validated', 'notes']
 
 # === VIEWSETS ===
-class ProductCategoryViewSet(viewsets.ModelViewSet):
+class KeysetPagination(CursorPagination):
+    """Pagination par curseur sur (created_at, id) : ni COUNT(*) ni OFFSET, coût constant en profondeur"""
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+class ConditionalGetMixin:
+    """list / retrieve conditionnels : 304 avant toute sérialisation.
+    
+    Les validateurs (nombre de lignes, plus récent des horodatages de
+    conditional_fields) viennent d'une seule requête agrégée. conditional_fields
+    inclut les horodatages des objets liés affichés par le serializer.
+    
+    Les listes n'ont que l'ETag : une ligne supprimée ou sortie du filtre
+    (désactivée) ne fait pas avancer le plus récent des horodatages, un
+    If-Modified-Since répondrait 304 à tort. Le nombre de lignes de l'ETag,
+    lui, change.
+    """
+    conditional_fields = ['updated_at']
+    
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, {}, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+            with_last_modified=False,
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        return self.conditional_response(request, lookup, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
+    
+    def conditional_response(self, request, lookup, build, with_last_modified=True):
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            state = queryset.filter(**lookup).order_by().aggregate(
+                count=Count('pk'), **{f'max_{i}': Max(field) for i, field in enumerate(self.conditional_fields)}
+            )
+        except (TypeError, ValueError, DjangoValidationError):
+            # Identifiant mal formé : la vue répondra 404
+            return build()
+        count = state.pop('count')
+        last_modified = max((value for value in state.values() if value), default=None)
+        fingerprint = f'{request.get_full_path()}|{request.accepted_media_type}|{count}|{last_modified}'
+        etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+        
+        validators = Response()
+        validators['ETag'] = etag
+        timestamp = int(last_modified.timestamp()) if last_modified and with_last_modified else None
+        if timestamp:
+            validators['Last-Modified'] = http_date(timestamp)
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp, response=validators)
+        if response is not validators:
+            return response
+        
+        response = build()
+        if response.status_code == status.HTTP_200_OK:
+            for header, value in validators.items():
+                response[header] = value
+        return response
+
+class CatalogueCacheMixin:
+    """Lectures du catalogue servies par sfs_products.catalogue (cache versionné, ETag)"""
+    
+    def list(self, request, *args, **kwargs):
+        return catalogue.cached_response(request, lambda: super(CatalogueCacheMixin, self).list(request, *args, **kwargs))
+    
+    def retrieve(self, request, *args, **kwargs):
+        return catalogue.cached_response(request, lambda: super(CatalogueCacheMixin, self).retrieve(request, *args, **kwargs))
+
+class ProductCategoryViewSet(CatalogueCacheMixin, viewsets.ModelViewSet):
     queryset = ProductCategory.objects.filter(is_active=True)
     serializer_class = ProductCategorySerializer
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.filter(is_active=True)
+class ProductFilter(django_filters.FilterSet):
+    in_season = django_filters.BooleanFilter(method='filter_in_season')
+    month = django_filters.NumberFilter(method='filter_month', min_value=1, max_value=12)
+    
+    class Meta:
+        model = Product
+        fields = ['category', 'is_seasonal']
+    
+    def filter_in_season(self, queryset, name, value):
+        month = self.form.cleaned_data.get('month')
+        in_season = queryset.in_season(int(month) if month else None)
+        return in_season if value else queryset.exclude(pk__in=in_season.values('pk'))
+    
+    def filter_month(self, queryset, name, value):
+        # Simple paramètre de filter_in_season
+        return queryset
+
+class ProductSearchFilter(filters.SearchFilter):
+    """?search= servi par l'index plein texte (product_search) plutôt que LIKE '%q%'"""
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return product_search.filter_products(queryset, query)
+
+class ProductViewSet(CatalogueCacheMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.filter(is_active=True).select_related('category')
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['category', 'is_seasonal']
-    search_fields = ['name', 'code']
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter]
+    filterset_class = ProductFilter
+    
+    @action(detail=False)
+    def search(self, request):
+        """Produits les plus pertinents pour ?q= (saisie semi-automatique de la boutique)"""
+        return catalogue.cached_response(request, lambda: self.search_response(request))
+    
+    def search_response(self, request):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), SEARCH_MAX_RESULTS))
+        except ValueError:
+            return Response({'error': 'limit doit être un entier'}, status=400)
+        products = product_search.ranked(
+            self.filter_queryset(self.get_queryset()), request.query_params.get('q', ''), limit=limit,
+        )
+        return Response(self.get_serializer(products, many=True).data)
     
     @action(detail=False)
     def in_season(self, request):
-        products = [p for p in self.get_queryset() if p.is_in_season]
-        serializer = self.get_serializer(products, many=True)
-        return Response(serializer.data)
+        return catalogue.cached_response(request, lambda: self.in_season_response(request))
+    
+    def in_season_response(self, request):
+        products = self.filter_queryset(self.get_queryset())
+        if 'in_season' not in request.query_params:
+            # month a déjà été validé par ProductFilter
+            month = request.query_params.get('month')
+            products = products.in_season(int(Decimal(month)) if month else None)
+        page = self.paginate_queryset(products)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
-class StockLocationViewSet(viewsets.ModelViewSet):
+class StockLocationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = StockLocation.objects.filter(is_active=True)
     serializer_class = StockLocationSerializer
 
-class StockViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Stock.objects.all()
+class StockViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Stock.objects.select_related('product', 'location')
+    conditional_fields = ['last_updated', 'product__updated_at', 'location__updated_at']
     serializer_class = StockSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['product', 'location']
     
     @action(detail=False)
     def low_stock(self, request):
-        stocks = [s for s in self.get_queryset() if s.is_low_stock]
-        serializer = self.get_serializer(stocks, many=True)
-        return Response(serializer.data)
+        stocks = self.filter_queryset(self.get_queryset()).low_stock().order_by('low_margin', 'pk')
+        page = self.paginate_queryset(stocks)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False)
+    def as_of(self, request):
+        """Quantités à la date ?at=<ISO> (instantané le plus proche + rejeu borné du journal)"""
+        try:
+            moment = parse_bound(request.query_params.get('at'))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=400)
+        if moment is None:
+            return Response({'error': 'at est requis'}, status=400)
+        stocks = history.with_quantity_as_of(self.filter_queryset(self.get_queryset()).order_by('pk'), moment)
+        page = self.paginate_queryset(stocks)
+        return self.get_paginated_response(StockAsOfSerializer(page, many=True).data)
+    
+    @action(detail=False)
+    def alerts(self, request):
+        """Franchissements de seuil depuis le curseur ?since=<id> (flux à interroger)"""
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            return Response({'error': 'since doit être un entier'}, status=400)
+        alerts = list(
+            StockAlert.objects.filter(pk__gt=since)
+            .select_related('stock__product', 'stock__location')[:ALERTS_PAGE_SIZE]
+        )
+        return Response({
+            'cursor': alerts[-1].pk if alerts else since,
+            'results': StockAlertSerializer(alerts, many=True).data,
+        })
+    
+    @action(detail=False, methods=['post'])
+    def intake(self, request):
+        """Réception en masse : rows JSON ou fichier CSV (product, location, quantity)"""
+        return self.import_stock(request, 'intake')
+    
+    @action(detail=False, methods=['post'])
+    def count(self, request):
+        """Inventaire : les quantités comptées remplacent les quantités en stock"""
+        return self.import_stock(request, 'count')
+    
+    def import_stock(self, request, mode):
+        upload = request.FILES.get('file')
+        if upload is not None:
+            try:
+                rows = intake.parse_csv(upload.read().decode('utf-8-sig'))
+            except UnicodeDecodeError:
+                return Response({'error': 'Le fichier doit être encodé en UTF-8'}, status=400)
+        else:
+            rows = request.data.get('rows')
+        if not isinstance(rows, list) or not rows:
+            return Response({'error': 'rows (liste) ou file (CSV) est requis'}, status=400)
+        try:
+            summary = intake.import_rows(
+                rows, mode=mode,
+                reference=str(request.data.get('reference', ''))[:100],
+                note=str(request.data.get('note', '')),
+            )
+        except intake.IntakeError as exc:
+            return Response({'error': str(exc), 'rows': exc.errors}, status=400)
+        return Response(summary, status=201)
+
+class StockMovementFilter(django_filters.FilterSet):
+    product = django_filters.NumberFilter(field_name='stock__product')
+    location = django_filters.NumberFilter(field_name='stock__location')
+    start = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    end = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+    
+    class Meta:
+        model = StockMovement
+        fields = ['stock', 'movement_type', 'reference']
+
+class StockMovementViewSet(viewsets.ReadOnlyModelViewSet):
+    """Journal des mouvements (index stock / date et référence / date)"""
+    queryset = StockMovement.objects.all()
+    serializer_class = StockMovementSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = StockMovementFilter
+    pagination_class = KeysetPagination
+
+class CustomerSearchFilter(filters.SearchFilter):
+    """?search= servi par l'index de mots (customer_search_tokens) plutôt que LIKE '%q%'"""
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return customer_search.filter_customers(queryset, query)
 
 class CustomerViewSet(viewsets.ModelViewSet):
     queryset = Customer.objects.filter(is_active=True, is_anonymized=False)
     serializer_class = CustomerSerializer
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['first_name', 'last_name', 'email']
+    pagination_class = KeysetPagination
+    filter_backends = [CustomerSearchFilter]
     permission_classes = [AllowAny]
     
+    @action(detail=False)
+    def search(self, request):
+        """Meilleurs clients pour ?q= (début de nom, prénom, e-mail ou téléphone, accents ignorés)"""
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), SEARCH_MAX_RESULTS))
+        except ValueError:
+            return Response({'error': 'limit doit être un entier'}, status=400)
+        customers = customer_search.ranked(self.get_queryset(), request.query_params.get('q', ''), limit=limit)
+        return Response(CustomerSerializer(customers, many=True).data)
+    
     def get_permissions(self):
         if self.action == 'me':
             return [IsAuthenticated()]  # 👈 Force authentification pour 'me'
@@ -238,22 +505,24 @@ class CustomerViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            # Créer le User
-            user = User.objects.create_user(
-                username=username,
-                email=email,
-                password=password,
-                first_name=first_name,
-                last_name=last_name
-            )
-            
-            # Créer le Customer associé
-            customer = Customer.objects.create(
-                email=email,
-                first_name=first_name,
-                last_name=last_name,
-                phone=phone
-            )
+            with transaction.atomic():
+                # Créer le User
+                user = User.objects.create_user(
+                    username=username,
+                    email=email,
+                    password=password,
+                    first_name=first_name,
+                    last_name=last_name
+                )
+                
+                # Créer le Customer associé
+                customer = Customer.objects.create(
+                    email=email,
+                    first_name=first_name,
+                    last_name=last_name,
+                    phone=phone,
+                    user=user
+                )
             
             return Response({
                 'message': 'Compte créé avec succès',
@@ -268,43 +537,8 @@ class CustomerViewSet(viewsets.ModelViewSet):
             )
     @action(detail=False, methods=['get'])
     def me(self, request):
-        """Retourne les informations de l'utilisateur connecté"""
-        user = request.user
-        
-        # Retourner les infos du User Django
-        data = {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'first_name': user.first_name or '',
-            'last_name': user.last_name or '',
-            'is_staff': user.is_staff,
-            'is_superuser': user.is_superuser,
-            'is_active': user.is_active,
-        }
-        
-        # Si l'utilisateur a un Customer lié, ajouter les infos
-        try:
-            customer = Customer.objects.get(email=user.email)  
-            data['customer_id'] = customer.id
-            data['phone'] = customer.phone
-            data['address'] = customer.address_line1
-            data['postal_code'] = customer.postal_code
-            data['city'] = customer.city
-            
-            # Ajouter la carte de fidélité si elle existe
-            if hasattr(customer, 'loyalty_card'):
-                card = customer.loyalty_card
-                data['loyalty_card'] = {
-                    'card_number': card.card_number,
-                    'points_balance': float(card.points_balance),
-                    'is_active': card.is_active
-                }
-        except Customer.DoesNotExist:
-            # Pas de customer avec cet email
-            pass
-        
-        return Response(data)
+        """Retourne les informations de l'utilisateur connecté (client lié et carte compris)"""
+        return Response(profiles.me(request.user.pk))
     
     @action(detail=True, methods=['post'])
     def anonymize(self, request, pk=None):
@@ -312,11 +546,19 @@ class CustomerViewSet(viewsets.ModelViewSet):
         customer.anonymize()
         return Response({'message': 'Client anonymisé'})
     
+    @action(detail=False, url_path=r'scan/(?P<card_number>[^/]+)')
+    def scan(self, request, card_number=None):
+        """Scan en caisse : client et solde de la carte, depuis le cache des cartes récentes"""
+        data = cards.lookup(card_number)
+        if data is None:
+            return Response({'error': 'Carte non trouvée'}, status=404)
+        return Response(data)
+    
     @action(detail=False, methods=['post'])
     def search_by_card(self, request):
         card_number = request.data.get('card_number')
         try:
-            card = LoyaltyCard.objects.get(card_number=card_number)
+            card = LoyaltyCard.objects.select_related('customer').get(card_number=card_number)
             return Response({
                 'customer': CustomerSerializer(card.customer).data,
                 'loyalty_card': LoyaltyCardSerializer(card).data
@@ -324,16 +566,27 @@ class CustomerViewSet(viewsets.ModelViewSet):
         except LoyaltyCard.DoesNotExist:
             return Response({'error': 'Carte non trouvée'}, status=404)
 
-class LoyaltyCardViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = LoyaltyCard.objects.filter(is_active=True)
+class LoyaltyCardViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = LoyaltyCard.objects.filter(is_active=True).select_related('customer')
+    conditional_fields = ['updated_at', 'customer__updated_at']
     serializer_class = LoyaltyCardSerializer
 
 class SaleViewSet(viewsets.ModelViewSet):
     queryset = Sale.objects.all()
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['channel', 'location', 'customer', 'status']
     permission_classes = [AllowAny]
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve', 'update', 'partial_update', 'confirm', 'cancel'):
+            # Lignes, produits et client chargés en 3 requêtes quel que soit le nombre de ventes
+            queryset = queryset.select_related('customer', 'location').prefetch_related(
+                Prefetch('lines', queryset=SaleLine.objects.select_related('product'))
+            )
+        return queryset
+    
     def get_serializer_class(self):
         if self.action == 'create':
             return SaleCreateSerializer
@@ -341,36 +594,166 @@ class SaleViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def sync(self, request):
+        """Intègre en lot les ventes hors ligne, avec une clé d'idempotence par vente"""
         sales_data = request.data.get('sales', [])
-        synced = []
-        for sale_data in sales_data:
-            serializer = SaleCreateSerializer(data=sale_data)
-            if serializer.is_valid():
-                sale = serializer.save()
-                sale.synced = True
-                sale.save()
-                synced.append(sale)
+        if not isinstance(sales_data, list):
+            return Response({'error': 'sales doit être une liste'}, status=400)
         
-        return Response({
-            'synced_count': len(synced),
-            'sales': SaleSerializer(synced, many=True).data
-        })
+        # Clé absente : générée ici ; fournie : chaîne non vide de 64 caractères au plus
+        keys = [
+            sale_data.get('idempotency_key') if hasattr(sale_data, 'get') else None
+            for sale_data in sales_data
+        ]
+        keys = [sales_sync.new_key() if key is None else key for key in keys]
+        key_errors = [sales_sync.key_error(key) for key in keys]
+        already = sales_sync.existing_keys([key for key, error in zip(keys, key_errors) if error is None])
+        context = {**self.get_serializer_context(), 'prefetched': prefetch_sale_relations(sales_data)}
+        # Un seul serializer pour tout le lot : les champs ne sont construits qu'une fois
+        validator = SaleCreateSerializer(context=context)
+        
+        report, batch, seen = [], [], set()
+        for key, key_error, sale_data in zip(keys, key_errors, sales_data):
+            entry = {'idempotency_key': key}
+            report.append(entry)
+            if key_error is not None:
+                entry.update(status=sales_sync.REJECTED, errors={'idempotency_key': [key_error]})
+                continue
+            if key in already or key in seen:
+                entry.update(status=sales_sync.DUPLICATE, sale_number=already.get(key))
+                continue
+            try:
+                validated_data = validator.run_validation(sale_data)
+            except serializers.ValidationError as exc:
+                entry.update(status=sales_sync.REJECTED, errors=exc.detail)
+                continue
+            seen.add(key)
+            batch.append((key, validated_data))
+        
+        results = sales_sync.ingest(batch)
+        synced_count = 0
+        for entry in report:
+            if 'status' in entry:
+                continue
+            status_, sale = results[entry['idempotency_key']]
+            entry['status'] = status_
+            if sale is not None:
+                entry['sale_number'] = sale.sale_number
+                entry['id'] = sale.pk
+                synced_count += 1
+        
+        return Response({'synced_count': synced_count, 'results': report})
+    
+    def perform_update(self, serializer):
+        # Agrégats de ventes tenus par les signaux de Sale (sfs_sales.signals)
+        previous_status = serializer.instance.status
+        with transaction.atomic():
+            sale = serializer.save()
+            settle(sale, previous_status)
+    
+    @action(detail=True, methods=['post'])
+    def confirm(self, request, pk=None):
+        """Commande web payée : les réservations deviennent des sorties de stock"""
+        sale = self.get_object()
+        try:
+            confirmed = confirm_order(sale)
+        except InsufficientStock as exc:
+            return Response({'error': str(exc)}, status=409)
+        if not confirmed:
+            return Response({'error': "La commande n'est plus en attente"}, status=409)
+        return Response(SaleSerializer(sale).data)
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Commande web abandonnée : le stock réservé redevient disponible"""
+        sale = self.get_object()
+        if not cancel_order(sale):
+            return Response({'error': "La commande n'est plus en attente"}, status=409)
+        return Response(SaleSerializer(sale).data)
     
     @action(detail=False)
     def statistics(self, request):
-        from django.db.models import Sum, Count
-        sales = self.get_queryset().filter(status='COMPLETED')
-        return Response({
-            'total_sales': sales.count(),
-            'total_revenue': float(sales.aggregate(Sum('total'))['total__sum'] or 0),
-            'by_channel': {
-                channel: sales.filter(channel=code).count()
-                for code, channel in Sale.CHANNELS
-            }
-        })
+        """Ventilations et séries temporelles (?start=&end=&granularity=hour|day|week|month)"""
+        params = request.query_params
+        try:
+            if can_use_rollups(params):
+                data = rollup_statistics(
+                    start=params.get('start'), end=params.get('end'),
+                    granularity=params.get('granularity', 'day'),
+                    channel=params.get('channel'), location=params.get('location'),
+                )
+            else:
+                data = sales_statistics(
+                    self.filter_queryset(self.get_queryset()),
+                    start=params.get('start'), end=params.get('end'),
+                    granularity=params.get('granularity', 'day'),
+                )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=400)
+        return Response(data)
+    
+    @action(detail=False)
+    def top_products(self, request):
+        """Meilleures ventes par produit (?start=&end=&channel=&location=&limit=)"""
+        params = request.query_params
+        try:
+            data = top_products(
+                start=params.get('start'), end=params.get('end'),
+                channel=params.get('channel'), location=params.get('location'),
+                limit=min(int(params.get('limit', 20)), 200),
+            )
+        except (TypeError, ValueError) as exc:
+            return Response({'error': str(exc)}, status=400)
+        return Response(data)
 
-class DailyReportViewSet(viewsets.ModelViewSet):
-    queryset = DailyReport.objects.all()
+class DailyReportViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = DailyReport.objects.select_related('location')
+    conditional_fields = ['updated_at', 'location__updated_at']
     serializer_class = DailyReportSerializer
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['location', 'is_validated']
\ No newline at end of file
+    filterset_fields = ['location', 'is_validated']
+    
+    @action(detail=False, methods=['post'])
+    def close(self, request):
+        """Génère les rapports de tous les lieux pour date, ou de start à end (rattrapage)"""
+        try:
+            start, end = day_range(
+                request.data.get('start') or request.data.get('date') or str(timezone.localdate()),
+                request.data.get('end') or request.data.get('date') or str(timezone.localdate()),
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=400)
+        count = close_days(start, end)
+        reports = self.get_queryset().filter(date__range=(start, end)).select_related('location')
+        return Response({
+            'generated_count': count,
+            'reports': DailyReportSerializer(reports, many=True).data,
+        })
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def catalogue_delta(request):
+    """Catalogue et stocks modifiés depuis ?since=<watermark> (tout si absent), ?location= optionnel"""
+    try:
+        since = delta.parse_watermark(request.query_params.get('since'))
+        location = int(request.query_params['location']) if request.query_params.get('location') else None
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+    changes = delta.changes(since, location)
+    return Response({
+        'watermark': changes['watermark'],
+        'full': changes['full'],
+        'categories': ProductCategorySerializer(changes['categories'], many=True).data,
+        'products': ProductSerializer(changes['products'], many=True).data,
+        'stocks': StockSerializer(changes['stocks'], many=True).data,
+        'deleted': changes['deleted'],
+    })
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def health(request):
+    """Sonde du répartiteur de charge : l'API répond et la base aussi"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return Response({'status': 'error', 'database': connection.vendor}, status=503)
+    return Response({'status': 'ok', 'database': connection.vendor})
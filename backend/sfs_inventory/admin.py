@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import StockLocation, Stock, StockMovement
+from .models import StockLocation, Stock, StockMovement, StockReservation
 
 @admin.register(StockLocation)
 class StockLocationAdmin(admin.ModelAdmin):
@@ -13,4 +13,10 @@ class StockAdmin(admin.ModelAdmin):
 @admin.register(StockMovement)
 class StockMovementAdmin(admin.ModelAdmin):
     list_display = ['stock', 'movement_type', 'quantity', 'created_at']
-    list_filter = ['movement_type']
\ No newline at end of file
+    list_filter = ['movement_type']
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['reference', 'stock', 'quantity', 'status', 'expires_at']
+    list_filter = ['status']
+    search_fields = ['reference']
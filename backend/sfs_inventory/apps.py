@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SfsInventoryConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sfs_inventory'
+
+    def ready(self):
+        from sfs_inventory import signals  # noqa: F401
@@ -0,0 +1,98 @@
+# sfs_inventory/delta.py
+"""Synchronisation différentielle du catalogue et des stocks pour le POS.
+
+Le client garde le catalogue en local et renvoie le watermark reçu lors de
+la synchronisation précédente ; seules les lignes modifiées depuis sont
+renvoyées (index sur updated_at / last_updated). Les produits et catégories
+désactivés, les stocks d'un produit ou d'un lieu désactivé, ainsi que les
+suppressions définitives (sync_tombstones), sont signalés dans deleted.
+
+Une transaction plus longue peut enregistrer une modification horodatée
+juste avant le watermark d'une synchronisation concurrente : la requête
+suivante repart donc OVERLAP plus tôt. Le client applique les lignes en
+upsert, un doublon est sans effet.
+"""
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from sfs_inventory.models import Stock, SyncTombstone
+from sfs_products.models import Product, ProductCategory
+
+OVERLAP = timedelta(seconds=5)
+
+
+def parse_watermark(value):
+    """Watermark renvoyé par le client (None : synchronisation complète)"""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(f"Watermark invalide : {value}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def changes(since=None, location=None):
+    """Lignes à envoyer au client depuis since.
+
+    Retourne un dict : watermark, full (le client doit tout remplacer),
+    categories / products / stocks (querysets) et deleted (ids par type).
+    """
+    now = timezone.now()
+    # Le champ in_season dépend du mois : changement de mois, catalogue complet
+    full = since is None or timezone.localdate(since).month != timezone.localdate(now).month
+    categories = ProductCategory.objects.all()
+    products = Product.objects.select_related('category')
+    all_stocks = Stock.objects.all()
+    if location:
+        all_stocks = all_stocks.filter(location_id=location)
+    stocks = all_stocks.select_related('product', 'location').filter(
+        product__is_active=True, location__is_active=True,
+    )
+    deleted = {'products': [], 'categories': [], 'stocks': []}
+
+    if full:
+        return {
+            'watermark': now.isoformat(),
+            'full': True,
+            'categories': categories.filter(is_active=True),
+            'products': products.filter(is_active=True),
+            'stocks': stocks,
+            'deleted': deleted,
+        }
+
+    lower = since - OVERLAP
+    changed_categories = list(categories.filter(updated_at__gte=lower))
+    category_ids = [category.pk for category in changed_categories]
+    # Un renommage de catégorie change category_name des produits, idem pour les stocks
+    changed_products = list(products.filter(Q(updated_at__gte=lower) | Q(category_id__in=category_ids)))
+    product_ids = [product.pk for product in changed_products]
+    # Un lieu réactivé renvoie ses stocks
+    stocks = stocks.filter(
+        Q(last_updated__gte=lower) | Q(product_id__in=product_ids) | Q(location__updated_at__gte=lower)
+    )
+
+    deleted['categories'] = [c.pk for c in changed_categories if not c.is_active]
+    deleted['products'] = [p.pk for p in changed_products if not p.is_active]
+    # Stocks sortis de la synchronisation avec leur produit ou leur lieu
+    deleted['stocks'] = list(
+        all_stocks.filter(
+            Q(product__is_active=False, product_id__in=deleted['products'])
+            | Q(location__is_active=False, location__updated_at__gte=lower)
+        ).values_list('pk', flat=True)
+    )
+    for kind, object_id in SyncTombstone.objects.filter(deleted_at__gte=lower).values_list('kind', 'object_id'):
+        deleted[{'product': 'products', 'category': 'categories', 'stock': 'stocks'}[kind]].append(object_id)
+
+    return {
+        'watermark': now.isoformat(),
+        'full': False,
+        'categories': [c for c in changed_categories if c.is_active],
+        'products': [p for p in changed_products if p.is_active],
+        'stocks': stocks,
+        'deleted': deleted,
+    }
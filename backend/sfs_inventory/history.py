@@ -0,0 +1,86 @@
+# sfs_inventory/history.py
+"""Quantités en stock à une date passée.
+
+On ne rejoue jamais tout le journal : la quantité part de l'instantané
+(stock_snapshots) le plus proche de la date demandée, puis on ajoute les
+mouvements postérieurs à cet instantané (ou on retire ceux qu'il inclut
+alors qu'ils sont postérieurs à la date). Sans instantané, on repart de la
+quantité actuelle. Le rejeu est donc borné par l'intervalle entre deux
+instantanés (commande snapshot_stocks, à planifier chaque nuit).
+"""
+from django.db.models import Case, DecimalField, Exists, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from sfs_inventory.ledger import signed_quantity_expression
+from sfs_inventory.models import Stock, StockMovement, StockSnapshot
+
+QUANTITY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def replay(**bounds):
+    """Somme signée des mouvements du stock courant (OuterRef) dans les bornes"""
+    movements = (
+        StockMovement.objects.filter(stock=OuterRef('pk'), **bounds)
+        .order_by().values('stock').annotate(total=Sum(signed_quantity_expression())).values('total')
+    )
+    return Coalesce(Subquery(movements, output_field=QUANTITY), Value(0), output_field=QUANTITY)
+
+
+def with_quantity_as_of(stocks, moment):
+    """Annote quantity_as_of et as_of_source ('snapshot', 'next_snapshot', 'current'), en une requête"""
+    previous = StockSnapshot.objects.filter(stock=OuterRef('pk'), taken_at__lte=moment).order_by('-taken_at', '-pk')
+    following = StockSnapshot.objects.filter(stock=OuterRef('pk'), taken_at__gt=moment).order_by('taken_at', 'pk')
+    return stocks.annotate(
+        previous_quantity=Subquery(previous.values('quantity')[:1], output_field=QUANTITY),
+        previous_movement=Subquery(previous.values('movement_id')[:1], output_field=IntegerField()),
+        next_quantity=Subquery(following.values('quantity')[:1], output_field=QUANTITY),
+        next_movement=Subquery(following.values('movement_id')[:1], output_field=IntegerField()),
+    ).annotate(
+        quantity_as_of=Case(
+            # Instantané antérieur + mouvements entre l'instantané et la date
+            When(previous_quantity__isnull=False, then=F('previous_quantity') + replay(
+                id__gt=OuterRef('previous_movement'), created_at__lte=moment,
+            )),
+            # Instantané postérieur - mouvements qu'il inclut après la date
+            When(next_quantity__isnull=False, then=F('next_quantity') - replay(
+                id__lte=OuterRef('next_movement'), created_at__gt=moment,
+            )),
+            default=F('quantity') - replay(created_at__gt=moment),
+            output_field=QUANTITY,
+        ),
+        as_of_source=Case(
+            When(previous_quantity__isnull=False, then=Value('snapshot')),
+            When(next_quantity__isnull=False, then=Value('next_snapshot')),
+            default=Value('current'),
+        ),
+    )
+
+
+def take_snapshots(stocks=None, moment=None):
+    """Enregistre la quantité actuelle des stocks ; retourne le nombre d'instantanés"""
+    stocks = Stock.objects.all() if stocks is None else stocks
+    last_movement = (
+        StockMovement.objects.filter(stock=OuterRef('pk'))
+        .order_by().values('stock').annotate(last=Max('id')).values('last')
+    )
+    # Quantité et dernier mouvement lus dans la même requête
+    rows = stocks.order_by().annotate(
+        last_movement=Coalesce(Subquery(last_movement, output_field=IntegerField()), Value(0)),
+    ).values_list('pk', 'quantity', 'last_movement')
+    taken_at = moment or timezone.now()
+    snapshots = [
+        StockSnapshot(stock_id=pk, quantity=quantity, movement_id=movement_id, taken_at=taken_at)
+        for pk, quantity, movement_id in rows
+    ]
+    StockSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    return len(snapshots)
+
+
+def prune_snapshots(before):
+    """Supprime les instantanés antérieurs à before, sauf le dernier de chaque stock ; retourne leur nombre"""
+    newer = StockSnapshot.objects.filter(stock=OuterRef('stock')).filter(
+        Q(taken_at__gt=OuterRef('taken_at')) | Q(taken_at=OuterRef('taken_at'), pk__gt=OuterRef('pk'))
+    )
+    deleted, _ = StockSnapshot.objects.filter(taken_at__lt=before).filter(Exists(newer)).delete()
+    return deleted
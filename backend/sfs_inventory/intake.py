@@ -0,0 +1,142 @@
+# sfs_inventory/intake.py
+"""Réceptions de marchandise et inventaires en masse.
+
+Chaque ligne désigne un produit et un lieu (code ou identifiant) et une
+quantité. En réception (intake) la quantité est ajoutée au stock, en
+inventaire (count) elle remplace la quantité comptée : un mouvement
+ADJUSTMENT porte l'écart. Les lignes d'un même couple produit / lieu
+s'additionnent (plusieurs cagettes du même produit). Les stocks absents du
+fichier ne sont pas modifiés.
+
+Tout le lot est validé avant écriture, puis appliqué en une transaction :
+mouvements en bulk_create, quantités par UPDATE groupés (ledger).
+"""
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from sfs_inventory import ledger
+from sfs_inventory.models import Stock, StockLocation, StockMovement
+from sfs_products.models import Product
+
+MODES = {'intake': 'IN', 'count': 'ADJUSTMENT'}
+
+
+class IntakeError(Exception):
+    """Lot refusé : errors liste les lignes invalides"""
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} ligne(s) invalide(s)")
+
+
+def parse_csv(text):
+    """Lignes d'un CSV à en-têtes product, location, quantity (séparateur , ou ;)"""
+    try:
+        dialect = csv.Sniffer().sniff(text.split('\n', 1)[0], delimiters=',;')
+    except csv.Error:
+        dialect = csv.excel
+    return list(csv.DictReader(io.StringIO(text), dialect=dialect))
+
+
+def resolve(model, keys):
+    """{clé: pk} pour des codes ou des identifiants, code prioritaire (« 1 » : code 1 avant id 1)"""
+    resolved = dict(model.objects.filter(code__in=keys).values_list('code', 'pk'))
+    # Identifiant : seulement pour les clés numériques qui ne sont pas un code
+    ids = {key: int(key) for key in keys if key not in resolved and key.isascii() and key.isdigit()}
+    if ids:
+        found = set(model.objects.filter(pk__in=ids.values()).values_list('pk', flat=True))
+        resolved.update({key: pk for key, pk in ids.items() if pk in found})
+    return resolved
+
+
+def clean(rows, mode):
+    """{(produit, lieu): quantité} à partir des lignes brutes ; lève IntakeError"""
+    errors, parsed = [], []
+    for number, row in enumerate(rows, start=1):
+        if not hasattr(row, 'get'):
+            errors.append({'row': number, 'error': 'Ligne invalide'})
+            continue
+        product = str(row.get('product') or '').strip()
+        location = str(row.get('location') or '').strip()
+        try:
+            quantity = Decimal(str(row.get('quantity')).strip().replace(',', '.'))
+        except (InvalidOperation, ValueError):
+            errors.append({'row': number, 'error': f"Quantité invalide : {row.get('quantity')}"})
+            continue
+        if not product or not location:
+            errors.append({'row': number, 'error': 'product et location sont requis'})
+        elif not quantity.is_finite() or quantity < 0 or (mode == 'intake' and quantity == 0):
+            errors.append({'row': number, 'error': f"Quantité invalide : {quantity}"})
+        else:
+            parsed.append((number, product, location, quantity))
+
+    products = resolve(Product, {product for _, product, _, _ in parsed})
+    locations = resolve(StockLocation, {location for _, _, location, _ in parsed})
+    totals = {}
+    for number, product, location, quantity in parsed:
+        if product not in products:
+            errors.append({'row': number, 'error': f"Produit inconnu : {product}"})
+        elif location not in locations:
+            errors.append({'row': number, 'error': f"Lieu inconnu : {location}"})
+        else:
+            key = (products[product], locations[location])
+            totals[key] = totals.get(key, Decimal('0')) + quantity
+    if errors:
+        raise IntakeError(sorted(errors, key=lambda error: error['row']))
+    return totals
+
+
+def stocks_for(pairs):
+    """{(produit, lieu): Stock}, lignes de stock manquantes créées (3 requêtes)"""
+    product_ids = {product_id for product_id, _ in pairs}
+    location_ids = {location_id for _, location_id in pairs}
+
+    def fetch():
+        queryset = Stock.objects.filter(product_id__in=product_ids, location_id__in=location_ids)
+        return {(stock.product_id, stock.location_id): stock for stock in queryset}
+
+    stocks = fetch()
+    missing = [pair for pair in pairs if pair not in stocks]
+    if missing:
+        Stock.objects.bulk_create(
+            [Stock(product_id=product_id, location_id=location_id) for product_id, location_id in missing],
+            batch_size=ledger.CHUNK_SIZE, ignore_conflicts=True,
+        )
+        stocks = fetch()
+    return stocks, len(missing)
+
+
+def import_rows(rows, mode='intake', reference='', note=''):
+    """Applique un lot de réception ou d'inventaire ; retourne un résumé"""
+    if mode not in MODES:
+        raise ValueError(f"mode doit valoir {', '.join(MODES)}")
+    totals = clean(rows, mode)
+
+    with transaction.atomic():
+        stocks, created = stocks_for(list(totals))
+        if mode == 'count':
+            # Quantités relues sous verrou : l'écart reste juste si une vente passe en même temps
+            current = {stock.pk: stock.quantity for stock in ledger.lock_stocks([s.pk for s in stocks.values()])}
+        movements = []
+        for pair, quantity in totals.items():
+            stock = stocks[pair]
+            if mode == 'count':
+                quantity -= current[stock.pk]
+                if not quantity:
+                    continue
+            movements.append(StockMovement(
+                stock=stock, movement_type=MODES[mode], quantity=quantity,
+                reference=reference, note=note,
+            ))
+        # Une réception ou un comptage ne sont jamais refusés pour survente
+        ledger.record_movements(movements, oversell=True)
+
+    return {
+        'mode': mode,
+        'rows': len(rows),
+        'stocks': len(totals),
+        'created_stocks': created,
+        'movements': len(movements),
+    }
@@ -0,0 +1,178 @@
+# sfs_inventory/ledger.py
+"""Application des mouvements de stock côté base de données.
+
+Les quantités ne sont jamais recalculées en Python : chaque mouvement est un
+UPDATE avec F(), éventuellement conditionnel (refus de survente) pour que deux
+caisses qui vendent les mêmes pommes ne se marchent pas dessus.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, Q, Value, When
+from django.db.models.functions import Abs
+from django.dispatch import Signal
+from django.utils import timezone
+
+from sfs_inventory.models import Stock, StockAlert, StockMovement
+
+# Émis avec alerts=[StockAlert, ...] à chaque franchissement de seuil
+threshold_crossed = Signal()
+# Stocks par UPDATE dans apply_deltas
+CHUNK_SIZE = 500
+
+
+class InsufficientStock(Exception):
+    """Levée quand un mouvement rendrait un stock négatif"""
+    def __init__(self, stock_ids):
+        self.stock_ids = list(stock_ids)
+        super().__init__(f"Stock insuffisant pour {self.stock_ids}")
+
+
+def signed_quantity(movement_type, quantity):
+    """Variation de stock induite par un mouvement (ADJUSTMENT est signé)"""
+    if movement_type == 'IN':
+        return abs(quantity)
+    if movement_type == 'OUT':
+        return -abs(quantity)
+    return quantity
+
+
+def signed_quantity_expression():
+    """signed_quantity en SQL, pour sommer le journal (ajustements historiques sans effet)"""
+    return Case(
+        When(applies_to_stock=False, then=Value(0)),
+        When(movement_type='IN', then=Abs('quantity')),
+        When(movement_type='OUT', then=Abs('quantity') * Value(-1)),
+        default=F('quantity'),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def allow_oversell(value=None):
+    if value is not None:
+        return value
+    return getattr(settings, 'STOCK_ALLOW_OVERSELL', True)
+
+
+def lock_stocks(stock_ids):
+    """Verrouille les lignes de stock (SELECT ... FOR UPDATE) si la base le permet"""
+    queryset = Stock.objects.filter(pk__in=stock_ids).order_by('pk')
+    if connection.features.has_select_for_update:
+        queryset = queryset.select_for_update()
+    return list(queryset)
+
+
+def apply_deltas(deltas, oversell=None):
+    """Applique {stock_id: variation} en un seul UPDATE (par paquet de CHUNK_SIZE stocks).
+
+    Si la survente est interdite, la condition est portée par le WHERE :
+    un nombre de lignes modifiées inférieur au nombre de stocks suffit à
+    détecter le problème, sans relire la table.
+    """
+    deltas = {pk: Decimal(delta) for pk, delta in deltas.items() if delta}
+    items = list(deltas.items())
+    # Par paquets : un CASE de plusieurs milliers de branches serait évalué pour chaque ligne
+    return sum(
+        _apply_chunk(dict(items[start:start + CHUNK_SIZE]), oversell)
+        for start in range(0, len(items), CHUNK_SIZE)
+    )
+
+
+def group_by_delta(deltas):
+    """{variation: [stock_id, ...]} : une réception ou un inventaire n'ont que
+    quelques valeurs distinctes, donc quelques branches de CASE"""
+    groups = {}
+    for pk, delta in deltas.items():
+        groups.setdefault(delta, []).append(pk)
+    return groups
+
+
+def delta_expression(field, groups):
+    """field + variation de chaque stock, en une expression"""
+    if len(groups) == 1:
+        (delta, _), = groups.items()
+        return F(field) + delta
+    return Case(
+        *[When(pk__in=pks, then=F(field) + delta) for delta, pks in groups.items()],
+        default=F(field),
+    )
+
+
+def _apply_chunk(deltas, oversell):
+    groups = group_by_delta(deltas)
+    queryset = Stock.objects.filter(pk__in=deltas)
+    if not allow_oversell(oversell):
+        # Les quantités réservées (commandes web) ne sont pas vendables
+        guard = Q()
+        for delta, pks in groups.items():
+            if delta < 0:
+                guard |= Q(pk__in=pks, quantity__gte=F('reserved_quantity') - delta)
+            else:
+                guard |= Q(pk__in=pks)
+        queryset = queryset.filter(guard)
+
+    quantity = delta_expression('quantity', groups)
+    updated = queryset.update(quantity=quantity, last_updated=timezone.now())
+    if updated != len(deltas):
+        # Survente refusée : l'appelant annule sa transaction
+        raise InsufficientStock(sorted(pk for pk, delta in deltas.items() if delta < 0))
+    record_alerts(deltas)
+    return updated
+
+
+def record_alerts(deltas):
+    """Alerte les stocks dont la variation vient de franchir le seuil (1 SELECT).
+
+    Les lignes viennent d'être modifiées par cette transaction, elles sont donc
+    verrouillées : la marge avant mouvement vaut marge actuelle - variation.
+    """
+    rows = (
+        Stock.objects.filter(pk__in=deltas)
+        .values_list('pk', 'low_margin', 'quantity', 'reserved_quantity', 'low_stock_threshold')
+    )
+    alerts = []
+    for pk, margin, quantity, reserved, threshold in rows:
+        before = margin - deltas[pk]
+        if margin <= 0 < before:
+            kind = 'LOW'
+        elif before <= 0 < margin:
+            kind = 'RECOVERED'
+        else:
+            continue
+        alerts.append(StockAlert(
+            stock_id=pk, kind=kind, available_quantity=max(quantity - reserved, 0), threshold=threshold,
+        ))
+    if alerts:
+        StockAlert.objects.bulk_create(alerts)
+        threshold_crossed.send(sender=StockAlert, alerts=alerts)
+    return alerts
+
+
+def record_movements(movements, oversell=None, lock=False):
+    """Insère des StockMovement en bulk et applique leur effet sur les stocks"""
+    movements = list(movements)
+    if not movements:
+        return movements
+    deltas = {}
+    for movement in movements:
+        if not movement.applies_to_stock:
+            continue
+        delta = signed_quantity(movement.movement_type, movement.quantity)
+        deltas[movement.stock_id] = deltas.get(movement.stock_id, Decimal('0')) + delta
+    with transaction.atomic():
+        if lock:
+            lock_stocks(deltas)
+        StockMovement.objects.bulk_create(movements, batch_size=CHUNK_SIZE)
+        apply_deltas(deltas, oversell=oversell)
+    return movements
+
+
+def move(stock, movement_type, quantity, reference='', note='', oversell=None, lock=False):
+    """Enregistre un mouvement unique sur un stock"""
+    movement = StockMovement(
+        stock=stock, movement_type=movement_type, quantity=quantity,
+        reference=reference, note=note,
+    )
+    record_movements([movement], oversell=oversell, lock=lock)
+    return movement
@@ -0,0 +1,45 @@
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sfs_inventory import intake
+
+
+class Command(BaseCommand):
+    help = "Réception ou inventaire en masse depuis un fichier CSV ou JSON (product, location, quantity)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichier .csv ou .json (liste de lignes)')
+        parser.add_argument('--mode', choices=list(intake.MODES), default='intake',
+                            help="intake : quantités ajoutées ; count : quantités comptées")
+        parser.add_argument('--reference', default='', help='Référence des mouvements (bon de livraison...)')
+        parser.add_argument('--note', default='')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        try:
+            text = path.read_text(encoding='utf-8-sig')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        if path.suffix.lower() == '.json':
+            try:
+                rows = json.loads(text)
+            except ValueError as exc:
+                raise CommandError(f"JSON invalide : {exc}")
+            rows = rows.get('rows', []) if isinstance(rows, dict) else rows
+        else:
+            rows = intake.parse_csv(text)
+
+        started = time.perf_counter()
+        try:
+            summary = intake.import_rows(rows, mode=options['mode'], reference=options['reference'], note=options['note'])
+        except intake.IntakeError as exc:
+            for error in exc.errors[:20]:
+                self.stderr.write(f"ligne {error['row']} : {error['error']}")
+            raise CommandError(f"{exc}, rien n'a été importé")
+        self.stdout.write(
+            f"{summary['rows']} lignes, {summary['stocks']} stocks ({summary['created_stocks']} créés), "
+            f"{summary['movements']} mouvements en {time.perf_counter() - started:.2f}s"
+        )
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from sfs_inventory.history import prune_snapshots, take_snapshots
+
+
+class Command(BaseCommand):
+    help = "Instantané des quantités en stock, base des calculs à date (à planifier chaque nuit)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=None,
+                            help='Supprime les instantanés plus anciens (garde le dernier de chaque stock)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = take_snapshots()
+        self.stdout.write(f"{count} instantanés enregistrés")
+
+        if options['keep_days'] is not None:
+            limit = timezone.now() - timedelta(days=options['keep_days'])
+            # Un calcul plus ancien repartira de l'instantané suivant
+            deleted = prune_snapshots(limit)
+            self.stdout.write(f"{deleted} instantanés antérieurs au {limit:%Y-%m-%d} supprimés")
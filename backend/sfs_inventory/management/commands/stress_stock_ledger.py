@@ -0,0 +1,89 @@
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from sfs_inventory import ledger
+from sfs_inventory.models import Stock, StockLocation, StockMovement
+from sfs_products.models import Product, ProductCategory
+
+
+class Command(BaseCommand):
+    help = "Stress test : plusieurs threads décrémentent la même ligne de stock"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--movements', type=int, default=200, help='Mouvements par thread')
+        parser.add_argument('--initial', type=Decimal, default=None,
+                            help='Quantité initiale (défaut : la moitié des sorties, pour tester la survente)')
+        parser.add_argument('--oversell', action='store_true', help='Autoriser les stocks négatifs')
+        parser.add_argument('--lock', action='store_true', help='SELECT ... FOR UPDATE avant chaque mouvement')
+
+    def handle(self, *args, **options):
+        threads, per_thread = options['threads'], options['movements']
+        oversell = options['oversell']
+        total = threads * per_thread
+        initial = options['initial'] if options['initial'] is not None else Decimal(total // 2)
+
+        tag = uuid.uuid4().hex[:8].upper()
+        category = ProductCategory.objects.create(name=f'STRESS-{tag}', is_active=False)
+        product = Product.objects.create(code=f'STRESS-{tag}', name='Stress', category=category,
+                                         base_price=Decimal('1.00'), is_active=False)
+        location = StockLocation.objects.create(code=f'S-{tag}', name='Stress', is_active=False)
+        stock = Stock.objects.create(product=product, location=location, quantity=initial)
+
+        counters = {'ok': 0, 'rejected': 0, 'retries': 0}
+        mutex = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(per_thread):
+                    while True:
+                        try:
+                            ledger.move(stock, 'OUT', Decimal('1'), reference=f'STRESS-{tag}',
+                                        oversell=oversell, lock=options['lock'])
+                            key = 'ok'
+                        except ledger.InsufficientStock:
+                            key = 'rejected'
+                        except OperationalError:
+                            # SQLite : base verrouillée, on réessaie
+                            with mutex:
+                                counters['retries'] += 1
+                            time.sleep(0.001)
+                            continue
+                        with mutex:
+                            counters[key] += 1
+                        break
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        try:
+            stock.refresh_from_db()
+            recorded = StockMovement.objects.filter(stock=stock).count()
+            expected = initial - counters['ok']
+            self.stdout.write(
+                f"{total} mouvements en {elapsed:.2f}s ({total / elapsed:.0f}/s) - "
+                f"acceptés {counters['ok']}, refusés {counters['rejected']}, "
+                f"reprises {counters['retries']}"
+            )
+            self.stdout.write(f"Stock final {stock.quantity} (attendu {expected}), {recorded} mouvements")
+            if stock.quantity != expected or recorded != counters['ok']:
+                raise CommandError("Mises à jour perdues : le stock ne correspond pas au journal")
+            if not oversell and stock.quantity < 0:
+                raise CommandError("Survente détectée malgré le refus")
+        finally:
+            location.delete()
+            product.delete()
+            category.delete()
+        self.stdout.write(self.style.SUCCESS("Aucune mise à jour perdue"))
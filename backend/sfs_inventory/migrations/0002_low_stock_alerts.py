@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:18
+
+import django.db.models.deletion
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_inventory', '0001_initial'),
+        ('sfs_products', '0002_products_season_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('LOW', 'Stock bas'), ('RECOVERED', 'Stock reconstitué')], max_length=20)),
+                ('available_quantity', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('threshold', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'stock_alerts',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('quantity'), '-', models.F('reserved_quantity')), '-', models.F('low_stock_threshold')), name='stocks_low_margin_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockalert',
+            name='stock',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='sfs_inventory.stock'),
+        ),
+    ]
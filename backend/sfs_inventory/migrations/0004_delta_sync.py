@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_inventory', '0003_stocklocation_updated_at'),
+        ('sfs_products', '0003_delta_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Produit'), ('category', 'Catégorie'), ('stock', 'Stock')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'sync_tombstones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['last_updated'], name='stocks_last_updated_idx'),
+        ),
+    ]
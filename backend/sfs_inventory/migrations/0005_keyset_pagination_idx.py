@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_inventory', '0004_delta_sync'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['created_at', 'id'], name='movements_created_id_idx'),
+        ),
+    ]
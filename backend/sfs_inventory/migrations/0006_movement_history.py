@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_inventory', '0005_keyset_pagination_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('movement_id', models.BigIntegerField(default=0)),
+                ('taken_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'stock_snapshots',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['stock', 'created_at', 'id'], name='movements_stock_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['reference', 'created_at'], name='movements_reference_idx'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='stock',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='sfs_inventory.stock'),
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['stock', 'taken_at'], name='snapshots_stock_taken_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_inventory', '0006_movement_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('reference', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('CONFIRMED', 'Convertie en sortie'), ('RELEASED', 'Libérée'), ('EXPIRED', 'Expirée')], default='ACTIVE', max_length=20)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='sfs_inventory.stock')),
+            ],
+            options={
+                'db_table': 'stock_reservations',
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='reservations_expiry_idx'), models.Index(fields=['reference', 'status'], name='reservations_reference_idx')],
+            },
+        ),
+    ]
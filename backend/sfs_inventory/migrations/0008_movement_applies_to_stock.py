@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:10
+
+from django.db import migrations, models
+from django.db.migrations.recorder import MigrationRecorder
+
+# Première migration livrée avec le journal (sfs_inventory.ledger) qui
+# applique les ADJUSTMENT : les ajustements antérieurs n'avaient pas d'effet
+LEDGER_MIGRATION = ('sfs_inventory', '0002_low_stock_alerts')
+
+
+def mark_legacy_adjustments(apps, schema_editor):
+    StockMovement = apps.get_model('sfs_inventory', 'StockMovement')
+    app, name = LEDGER_MIGRATION
+    cutoff = (
+        MigrationRecorder(schema_editor.connection).migration_qs
+        .filter(app=app, name=name).values_list('applied', flat=True).first()
+    )
+    if cutoff is not None:
+        StockMovement.objects.filter(movement_type='ADJUSTMENT', created_at__lt=cutoff).update(applies_to_stock=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_inventory', '0007_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='applies_to_stock',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(mark_legacy_adjustments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:40
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_inventory', '0008_movement_applies_to_stock'),
+        ('sfs_products', '0004_product_search'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='stock',
+            name='stocks_low_margin_idx',
+        ),
+        migrations.AddField(
+            model_name='stock',
+            name='low_margin',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('quantity'), '-', models.F('reserved_quantity')), '-', models.F('low_stock_threshold')), output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['low_margin'], name='stocks_low_margin_idx'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 # sfs_inventory/models.py
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from decimal import Decimal
 from sfs_products.models import Product
@@ -8,6 +8,7 @@ class StockLocation(models.Model):
     code = models.CharField(max_length=20, unique=True)
     name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'stock_locations'
@@ -15,17 +16,36 @@ class StockLocation(models.Model):
     def __str__(self):
         return self.name
 
+class StockQuerySet(models.QuerySet):
+    def low_stock(self):
+        """Stocks dont la quantité disponible est sous le seuil, filtrés en SQL (index stocks_low_margin_idx)"""
+        return self.filter(low_margin__lte=0)
+
 class Stock(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stocks')
     location = models.ForeignKey(StockLocation, on_delete=models.CASCADE, related_name='stocks')
     quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     reserved_quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     low_stock_threshold = models.DecimalField(max_digits=10, decimal_places=2, default=10)
+    # Disponible - seuil, calculé par la base : le filtre et l'index lisent la
+    # même colonne (un index sur l'expression n'était pas utilisé, le SQL de
+    # l'index et celui du filtre différant d'un CAST sous SQLite)
+    low_margin = models.GeneratedField(
+        expression=models.F('quantity') - models.F('reserved_quantity') - models.F('low_stock_threshold'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+    )
     last_updated = models.DateTimeField(auto_now=True)
     
+    objects = StockQuerySet.as_manager()
+    
     class Meta:
         db_table = 'stocks'
         unique_together = ['product', 'location']
+        indexes = [
+            models.Index(fields=['low_margin'], name='stocks_low_margin_idx'),
+            models.Index(fields=['last_updated'], name='stocks_last_updated_idx'),
+        ]
     
     @property
     def available_quantity(self):
@@ -39,6 +59,13 @@ class Stock(models.Model):
         return f"{self.product.name} @ {self.location.name}"
 
 class StockMovement(models.Model):
+    """Mouvement de stock : IN ajoute, OUT retire, ADJUSTMENT ajoute sa quantité signée.
+    
+    Jusqu'au journal sfs_inventory.ledger, un ADJUSTMENT n'avait aucun effet
+    sur le stock. Ces ajustements historiques sont gardés avec
+    applies_to_stock=False (migration 0008) : ils restent consultables mais
+    ne sont pas rejoués par les calculs à date.
+    """
     TYPES = [('IN', 'Entrée'), ('OUT', 'Sortie'), ('ADJUSTMENT', 'Ajustement')]
     
     stock = models.ForeignKey(Stock, on_delete=models.CASCADE)
@@ -47,17 +74,84 @@ class StockMovement(models.Model):
     reference = models.CharField(max_length=100, blank=True)
     note = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    applies_to_stock = models.BooleanField(default=True)
     
     class Meta:
         db_table = 'stock_movements'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='movements_created_id_idx'),
+            # Historique d'un stock et rejeu borné des calculs à date
+            models.Index(fields=['stock', 'created_at', 'id'], name='movements_stock_created_idx'),
+            models.Index(fields=['reference', 'created_at'], name='movements_reference_idx'),
+        ]
     
     def save(self, *args, **kwargs):
+        # Variation appliquée en base (UPDATE ... SET quantity = quantity + x)
+        from sfs_inventory.ledger import apply_deltas, signed_quantity
         is_new = self.pk is None
-        super().save(*args, **kwargs)
-        if is_new:
-            if self.movement_type == 'IN':
-                self.stock.quantity += abs(self.quantity)
-            elif self.movement_type == 'OUT':
-                self.stock.quantity -= abs(self.quantity)
-            self.stock.save()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new and self.applies_to_stock:
+                apply_deltas({self.stock_id: signed_quantity(self.movement_type, self.quantity)})
+
+class StockAlert(models.Model):
+    """Passage d'un stock sous son seuil (LOW) ou au-dessus (RECOVERED)"""
+    KINDS = [('LOW', 'Stock bas'), ('RECOVERED', 'Stock reconstitué')]
+    
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='alerts')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    available_quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    threshold = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'stock_alerts'
+        ordering = ['id']
+
+class StockSnapshot(models.Model):
+    """Quantité d'un stock à un instant, point de départ des calculs à date.
+    
+    movement_id est le dernier mouvement inclus dans quantity (0 si aucun).
+    """
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='snapshots')
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    movement_id = models.BigIntegerField(default=0)
+    taken_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'stock_snapshots'
+        indexes = [models.Index(fields=['stock', 'taken_at'], name='snapshots_stock_taken_idx')]
+
+class SyncTombstone(models.Model):
+    """Trace d'une suppression définitive, pour la synchronisation différentielle du POS"""
+    KINDS = [('product', 'Produit'), ('category', 'Catégorie'), ('stock', 'Stock')]
+    
+    kind = models.CharField(max_length=20, choices=KINDS)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        db_table = 'sync_tombstones'
+
+class StockReservation(models.Model):
+    """Quantité retenue pour une commande en attente (reference : numéro de vente)"""
+    STATUS = [
+        ('ACTIVE', 'Active'), ('CONFIRMED', 'Convertie en sortie'),
+        ('RELEASED', 'Libérée'), ('EXPIRED', 'Expirée'),
+    ]
+    
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    reference = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS, default='ACTIVE')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'stock_reservations'
+        indexes = [
+            # Balayage des réservations expirées et conversion d'une commande
+            models.Index(fields=['status', 'expires_at'], name='reservations_expiry_idx'),
+            models.Index(fields=['reference', 'status'], name='reservations_reference_idx'),
+        ]
@@ -0,0 +1,132 @@
+# sfs_inventory/reservations.py
+"""Réservation de stock pour les commandes web en attente.
+
+Une réservation augmente reserved_quantity par un UPDATE conditionnel
+(quantité disponible suffisante, vérifiée dans le WHERE) : deux paniers web
+et une caisse ne peuvent pas promettre les mêmes pommes. Elle est ensuite
+convertie en sortie de stock à la confirmation de la commande, libérée à
+l'annulation, ou expirée par le balayage périodique (sweep) passé le délai
+STOCK_RESERVATION_TTL.
+
+Les lignes de réservation sont verrouillées avant de changer de statut :
+confirmation, annulation et balayage concurrents ne rendent jamais deux fois
+la même quantité.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from sfs_inventory import ledger
+from sfs_inventory.models import Stock, StockMovement, StockReservation
+
+
+def ttl():
+    return timedelta(minutes=getattr(settings, 'STOCK_RESERVATION_TTL', 30))
+
+
+def adjust_reserved(deltas):
+    """reserved_quantity += {stock_id: variation}, par UPDATE groupés.
+
+    Une variation positive n'est appliquée que si la quantité disponible
+    suffit ; sinon InsufficientStock (l'appelant annule sa transaction).
+    """
+    deltas = {pk: Decimal(delta) for pk, delta in deltas.items() if delta}
+    items = list(deltas.items())
+    for start in range(0, len(items), ledger.CHUNK_SIZE):
+        chunk = dict(items[start:start + ledger.CHUNK_SIZE])
+        groups = ledger.group_by_delta(chunk)
+        guard = Q()
+        for delta, pks in groups.items():
+            if delta > 0:
+                guard |= Q(pk__in=pks, quantity__gte=F('reserved_quantity') + delta)
+            else:
+                guard |= Q(pk__in=pks)
+        updated = Stock.objects.filter(pk__in=chunk).filter(guard).update(
+            reserved_quantity=ledger.delta_expression('reserved_quantity', groups),
+            last_updated=timezone.now(),
+        )
+        if updated != len(chunk):
+            raise ledger.InsufficientStock(sorted(pk for pk, delta in chunk.items() if delta > 0))
+        # La marge disponible varie à l'inverse de la quantité réservée
+        ledger.record_alerts({pk: -delta for pk, delta in chunk.items()})
+
+
+def reserve(quantities, reference, expires_at=None):
+    """Réserve {stock_id: quantité} pour reference ; tout ou rien"""
+    quantities = {pk: Decimal(quantity) for pk, quantity in quantities.items() if quantity > 0}
+    expires_at = expires_at or timezone.now() + ttl()
+    reservations = [
+        StockReservation(stock_id=pk, quantity=quantity, reference=reference, expires_at=expires_at)
+        for pk, quantity in quantities.items()
+    ]
+    with transaction.atomic():
+        adjust_reserved(quantities)
+        StockReservation.objects.bulk_create(reservations, batch_size=ledger.CHUNK_SIZE)
+    return reservations
+
+
+def close(reservations, status, limit=None, skip_locked=False):
+    """Passe les réservations actives à status et rend leur quantité.
+
+    À appeler dans une transaction. Retourne les réservations traitées,
+    c'est-à-dire celles qu'aucune autre transaction n'a closes avant.
+    """
+    queryset = reservations.filter(status='ACTIVE').order_by('expires_at', 'pk')
+    if connection.features.has_select_for_update:
+        queryset = queryset.select_for_update(
+            skip_locked=skip_locked and connection.features.has_select_for_update_skip_locked,
+        )
+    rows = list(queryset[:limit] if limit else queryset)
+    if not rows:
+        return rows
+    StockReservation.objects.filter(pk__in=[row.pk for row in rows]).update(status=status)
+    deltas = {}
+    for row in rows:
+        deltas[row.stock_id] = deltas.get(row.stock_id, Decimal('0')) - row.quantity
+    adjust_reserved(deltas)
+    return rows
+
+
+def release(reference):
+    """Libère les réservations actives de reference (commande annulée)"""
+    with transaction.atomic():
+        return close(StockReservation.objects.filter(reference=reference), 'RELEASED')
+
+
+def confirm(reference, note='', oversell=None):
+    """Convertit les réservations actives de reference en sorties de stock"""
+    with transaction.atomic():
+        rows = close(StockReservation.objects.filter(reference=reference), 'CONFIRMED')
+        quantities = {}
+        for row in rows:
+            quantities[row.stock_id] = quantities.get(row.stock_id, Decimal('0')) + row.quantity
+        ledger.record_movements([
+            StockMovement(stock_id=pk, movement_type='OUT', quantity=quantity, reference=reference, note=note)
+            for pk, quantity in quantities.items()
+        ], oversell=oversell)
+    return rows
+
+
+def sweep(batch_size=500, now=None, on_expired=None):
+    """Expire les réservations échues, batch_size par transaction.
+
+    on_expired(références) est appelé dans la transaction de chaque paquet
+    (annulation des commandes correspondantes). Les lignes verrouillées par
+    une confirmation en cours sont sautées et reprises au passage suivant.
+    Retourne le nombre de réservations expirées.
+    """
+    now = now or timezone.now()
+    expired = StockReservation.objects.filter(expires_at__lte=now)
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = close(expired, 'EXPIRED', limit=batch_size, skip_locked=True)
+            if rows and on_expired is not None:
+                on_expired({row.reference for row in rows})
+        if not rows:
+            return total
+        total += len(rows)
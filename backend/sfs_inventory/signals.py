@@ -0,0 +1,16 @@
+# sfs_inventory/signals.py
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from sfs_inventory.models import Stock, SyncTombstone
+from sfs_products.models import Product, ProductCategory
+
+TOMBSTONE_KINDS = {Product: 'product', ProductCategory: 'category', Stock: 'stock'}
+
+
+@receiver(post_delete, sender=Product, dispatch_uid='tombstone_product')
+@receiver(post_delete, sender=ProductCategory, dispatch_uid='tombstone_category')
+@receiver(post_delete, sender=Stock, dispatch_uid='tombstone_stock')
+def record_tombstone(sender, instance, **kwargs):
+    """Le POS doit apprendre la suppression à sa prochaine synchronisation"""
+    SyncTombstone.objects.create(kind=TOMBSTONE_KINDS[sender], object_id=instance.pk)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SfsProductsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sfs_products'
+
+    def ready(self):
+        from sfs_products import signals  # noqa: F401
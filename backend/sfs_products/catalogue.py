@@ -0,0 +1,81 @@
+# sfs_products/catalogue.py
+"""Cache des réponses du catalogue (produits, catégories).
+
+Chaque réponse est rangée sous un numéro de version du catalogue. Toute
+modification d'un produit ou d'une catégorie incrémente ce numéro (signaux
+post_save / post_delete) : les anciennes entrées ne sont plus jamais lues
+et expirent d'elles-mêmes. Les clients revalident avec ETag / Last-Modified.
+
+Le cache 'catalogue' est en mémoire locale par défaut, donc propre à chaque
+processus ; avec plusieurs workers, le configurer sur Redis ou Memcached
+(CATALOGUE_CACHE_BACKEND) pour que l'invalidation soit partagée.
+"""
+import hashlib
+import json
+import time
+from datetime import date
+
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = 'catalogue:version'
+
+
+def get_cache():
+    return caches['catalogue']
+
+
+def current_version():
+    """(numéro de version, horodatage de la dernière modification)"""
+    cache = get_cache()
+    state = cache.get_many([VERSION_KEY, f'{VERSION_KEY}:modified'])
+    version = state.get(VERSION_KEY)
+    if version is None:
+        # Départ (ou éviction) : une version jamais utilisée, pour ne pas
+        # relire des entrées d'une version précédente encore en cache
+        version, modified = time.time_ns(), int(time.time())
+        cache.add(VERSION_KEY, version, timeout=None)
+        cache.add(f'{VERSION_KEY}:modified', modified, timeout=None)
+        return cache.get(VERSION_KEY, version), cache.get(f'{VERSION_KEY}:modified', modified)
+    return version, state.get(f'{VERSION_KEY}:modified') or int(time.time())
+
+
+def invalidate(**kwargs):
+    """Périme tout le catalogue (après validation des modifications de produits / catégories)"""
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+    cache.set(f'{VERSION_KEY}:modified', int(time.time()), timeout=None)
+
+
+def cached_response(request, build):
+    """Réponse de build() servie depuis le cache, 304 si le client est à jour.
+
+    build() n'est appelé qu'en cas d'absence ; seules les réponses 200 sont
+    gardées. La clé inclut le mois courant, dont dépend le champ in_season.
+    """
+    version, modified = current_version()
+    key = f'catalogue:{version}:{date.today().month}:{request.get_full_path()}'
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is None:
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        content = json.dumps(response.data, cls=DjangoJSONEncoder, sort_keys=True)
+        entry = (response.data, quote_etag(hashlib.md5(content.encode()).hexdigest()))
+        cache.set(key, entry)
+    data, etag = entry
+
+    response = Response(data)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    # Le client doit revalider : une modification est visible immédiatement
+    patch_cache_control(response, no_cache=True)
+    return get_conditional_response(request, etag=etag, last_modified=modified, response=response)
@@ -0,0 +1,90 @@
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from sfs_products import search
+from sfs_products.models import Product, ProductCategory
+
+VARIETIES = [
+    'Pêches', 'Céleri', 'Pommes', 'Poires', 'Abricots', 'Cerises', 'Fraises', 'Framboises', 'Prunes', 'Figues',
+    'Carottes', 'Poireaux', 'Épinards', 'Betteraves', 'Courgettes', 'Aubergines', 'Tomates', 'Pâtissons',
+    'Châtaignes', 'Noix', 'Navets', 'Radis', 'Échalotes', 'Oignons', 'Haricots', 'Fèves', 'Petits pois', 'Mâche',
+]
+QUALIFIERS = [
+    'de vigne', 'bio', 'rave', 'branche', 'plates', 'du Roussillon', 'de Provence', 'anciennes', 'nouvelles',
+    'jaunes', 'blanches', 'rouges', 'cœur de bœuf', 'primeur', 'extra', 'du verger', 'en botte', 'grillées',
+]
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    pick = lambda share: latencies[min(int(len(latencies) * share), len(latencies) - 1)] * 1000
+    return f"p50 {pick(0.50):.2f} ms, p99 {pick(0.99):.2f} ms, max {latencies[-1] * 1000:.2f} ms"
+
+
+class Command(BaseCommand):
+    help = ("Benchmark : saisie semi-automatique de la boutique, LIKE '%%q%%' (ancien SearchFilter) "
+            "contre index plein texte, sur des produits de test créés puis supprimés")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--limit', type=int, default=10, help='Résultats par recherche')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:6].upper()
+        rng = random.Random(0)
+        category = ProductCategory.objects.create(name=f'Bench {tag}', is_active=False)
+        self.stdout.write(f"Création de {options['products']} produits...")
+        for start in range(0, options['products'], 2000):
+            Product.objects.bulk_create([
+                Product(
+                    code=f'B{tag}{i}', name=f'{rng.choice(VARIETIES)} {rng.choice(QUALIFIERS)} {i}',
+                    category=category, base_price=Decimal('2.50'),
+                    description=' '.join(rng.choice(QUALIFIERS) for _ in range(6)),
+                )
+                for i in range(start, min(start + 2000, options['products']))
+            ])
+        products = Product.objects.filter(category=category)
+        try:
+            started = time.perf_counter()
+            search.index(products.select_related('category'))
+            self.stdout.write(f"indexés en {time.perf_counter() - started:.1f}s")
+
+            queries = self.queries(rng, options['queries'])
+            queryset = Product.objects.filter(is_active=True).select_related('category')
+            limit = options['limit']
+            self.report('LIKE %q% (avant)', queries, lambda query: list(self.like(queryset, query)[:limit]))
+            self.report('index, filtre ?search=', queries,
+                        lambda query: list(search.filter_products(queryset, query)[:limit]))
+            self.report('index, classement', queries, lambda query: search.ranked(queryset, query, limit=limit))
+        finally:
+            products.delete()
+            category.delete()
+
+    def queries(self, rng, count):
+        """Frappes successives dans le champ de recherche : 2 à 6 lettres, parfois un 2e mot"""
+        queries = []
+        for _ in range(count):
+            variety, qualifier = rng.choice(VARIETIES), rng.choice(QUALIFIERS)
+            typed = variety[:rng.randint(2, 6)]
+            queries.append(f'{typed} {qualifier[:3]}' if rng.random() < 0.3 else typed)
+        return queries
+
+    def like(self, queryset, query):
+        # Ce que générait SearchFilter sur name et code
+        for term in query.split():
+            queryset = queryset.filter(Q(name__icontains=term) | Q(code__icontains=term))
+        return queryset
+
+    def report(self, name, queries, run):
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            run(query)
+            latencies.append(time.perf_counter() - started)
+        self.stdout.write(f"{name:24} {len(queries)} recherches - {percentiles(latencies)}")
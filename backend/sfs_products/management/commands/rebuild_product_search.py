@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sfs_products.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche des produits (après un import en masse)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Produits par transaction')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(f"{count} produits indexés en {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_seasonal', 'season_start_month', 'season_end_month'], name='products_season_idx'),
+        ),
+    ]
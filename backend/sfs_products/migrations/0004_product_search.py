@@ -0,0 +1,69 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:05
+
+import unicodedata
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+# Copie figée de sfs_products.search et verger.text à la date de la
+# migration : le code de l'application peut évoluer depuis
+LIGATURES = str.maketrans({'œ': 'oe', 'Œ': 'OE', 'æ': 'ae', 'Æ': 'AE', 'ß': 'ss'})
+SQL = {
+    'sqlite': {
+        'create': [
+            "CREATE VIRTUAL TABLE product_search USING fts5("
+            "name, code, category, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        ],
+        'insert': "INSERT INTO product_search (rowid, name, code, category, description) VALUES (%s, %s, %s, %s, %s)",
+    },
+    'postgresql': {
+        'create': [
+            "CREATE TABLE product_search (product_id bigint PRIMARY KEY, document tsvector NOT NULL)",
+            "CREATE INDEX product_search_document_idx ON product_search USING gin (document)",
+        ],
+        'insert': (
+            "INSERT INTO product_search (product_id, document) VALUES (%s, "
+            "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'A') "
+            "|| setweight(to_tsvector('simple', %s), 'B') || setweight(to_tsvector('simple', %s), 'D'))"
+        ),
+    },
+}
+
+
+def fold(value):
+    value = unicodedata.normalize('NFKD', str(value or '').translate(LIGATURES))
+    return ''.join(char for char in value if not unicodedata.combining(char)).lower()
+
+
+def create(apps, schema_editor):
+    sql = SQL[schema_editor.connection.vendor]
+    Product = apps.get_model('sfs_products', 'Product')
+    with schema_editor.connection.cursor() as cursor:
+        for statement in sql['create']:
+            cursor.execute(statement)
+        last = 0
+        while True:
+            batch = list(
+                Product.objects.filter(pk__gt=last).order_by('pk')
+                .values_list('pk', 'name', 'code', 'category__name', 'description')[:BATCH_SIZE]
+            )
+            if not batch:
+                return
+            cursor.executemany(sql['insert'], [(pk, *(fold(value) for value in fields)) for pk, *fields in batch])
+            last = batch[-1][0]
+
+
+def drop(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_products', '0003_delta_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create, drop),
+    ]
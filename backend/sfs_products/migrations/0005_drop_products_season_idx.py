@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_products', '0004_product_search'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='products_season_idx',
+        ),
+    ]
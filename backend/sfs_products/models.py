@@ -7,6 +7,7 @@ class ProductCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
     display_order = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         db_table = 'product_categories'
@@ -15,6 +16,32 @@ class ProductCategory(models.Model):
     def __str__(self):
         return self.name
 
+class ProductQuerySet(models.QuerySet):
+    def in_season(self, month=None):
+        """Produits de saison pour le mois donné (par défaut le mois courant), filtrés en SQL.
+        
+        Pas d'index : les OR entre colonnes (saisons à cheval sur le nouvel an,
+        produits sans saison) imposent un parcours de products, petite table.
+        """
+        if month is None:
+            from datetime import date
+            month = date.today().month
+        no_season = (
+            models.Q(is_seasonal=False)
+            | models.Q(season_start_month__isnull=True)
+            | models.Q(season_end_month__isnull=True)
+        )
+        # Saison dans l'année (avril-septembre) ou à cheval sur le nouvel an (décembre-février)
+        same_year = (
+            models.Q(season_start_month__lte=models.F('season_end_month'))
+            & models.Q(season_start_month__lte=month, season_end_month__gte=month)
+        )
+        wrap_around = (
+            models.Q(season_start_month__gt=models.F('season_end_month'))
+            & (models.Q(season_start_month__lte=month) | models.Q(season_end_month__gte=month))
+        )
+        return self.filter(no_season | same_year | wrap_around)
+
 class Product(models.Model):
     UNIT_CHOICES = [('KG', 'Kg'), ('UNIT', 'Unité'), ('BUNCH', 'Botte'), ('BASKET', 'Panier')]
     
@@ -34,9 +61,14 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ProductQuerySet.as_manager()
+    
     class Meta:
         db_table = 'products'
         ordering = ['category', 'name']
+        indexes = [
+            models.Index(fields=['updated_at'], name='products_updated_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -0,0 +1,167 @@
+# sfs_products/search.py
+"""Recherche plein texte des produits, casse et accents repliés.
+
+Le nom, le code, la catégorie et la description de chaque produit sont
+repliés par verger.text.fold (« Pêches » -> « peches ») puis rangés dans la
+table product_search, selon la base :
+- SQLite : table virtuelle FTS5, classement bm25 ;
+- PostgreSQL : tsvector (configuration 'simple') sous index GIN, classement
+  ts_rank.
+Chaque mot saisi est un préfixe (« pec » trouve « pêches ») et tous doivent
+être présents ; le nom et le code pèsent plus que la catégorie, elle-même
+plus que la description.
+
+La table est tenue à jour à l'enregistrement ou à la suppression d'un
+produit ou d'une catégorie (signaux) ; rebuild() la reconstruit après un
+import en masse. Elle n'est pas liée à products par une clé étrangère, que
+TRUNCATE (flush) refuserait sous PostgreSQL : une ligne orpheline est
+ignorée, les résultats passant toujours par un queryset de produits.
+"""
+from django.db import connection as default_connection, transaction
+from django.db.models.expressions import RawSQL
+
+from sfs_products.models import Product
+from verger.text import fold, words
+
+MIN_TERM_LENGTH = 2
+MAX_TERMS = 6
+# Produits classés au plus par recherche
+CANDIDATES = 200
+CHUNK_SIZE = 500
+
+SQL = {
+    'sqlite': {
+        'create': [
+            "CREATE VIRTUAL TABLE product_search USING fts5("
+            "name, code, category, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        ],
+        'drop': ["DROP TABLE IF EXISTS product_search"],
+        'delete': "DELETE FROM product_search WHERE rowid IN ({ids})",
+        'insert': "INSERT INTO product_search (rowid, name, code, category, description) VALUES (%s, %s, %s, %s, %s)",
+        'match': "SELECT rowid FROM product_search WHERE product_search MATCH %s",
+        'ranked': (
+            "SELECT rowid FROM product_search WHERE product_search MATCH %s "
+            "ORDER BY bm25(product_search, 10.0, 8.0, 3.0, 1.0), rowid LIMIT %s"
+        ),
+    },
+    'postgresql': {
+        'create': [
+            "CREATE TABLE product_search (product_id bigint PRIMARY KEY, document tsvector NOT NULL)",
+            "CREATE INDEX product_search_document_idx ON product_search USING gin (document)",
+        ],
+        'drop': ["DROP TABLE IF EXISTS product_search"],
+        'delete': "DELETE FROM product_search WHERE product_id IN ({ids})",
+        'insert': (
+            "INSERT INTO product_search (product_id, document) VALUES (%s, "
+            "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'A') "
+            "|| setweight(to_tsvector('simple', %s), 'B') || setweight(to_tsvector('simple', %s), 'D'))"
+        ),
+        'match': "SELECT product_id FROM product_search WHERE document @@ to_tsquery('simple', %s)",
+        'ranked': (
+            "SELECT product_id FROM product_search, to_tsquery('simple', %s) AS query WHERE document @@ query "
+            "ORDER BY ts_rank(document, query) DESC, product_id LIMIT %s"
+        ),
+    },
+}
+
+
+def statements(connection=None):
+    return SQL[(connection or default_connection).vendor]
+
+
+def create_table(connection):
+    with connection.cursor() as cursor:
+        for sql in statements(connection)['create']:
+            cursor.execute(sql)
+
+
+def drop_table(connection):
+    with connection.cursor() as cursor:
+        for sql in statements(connection)['drop']:
+            cursor.execute(sql)
+
+
+def write(rows, connection=None):
+    """(Ré)indexe des lignes (id, nom, code, catégorie, description) : DELETE par lots, 1 INSERT groupé"""
+    connection = connection or default_connection
+    sql = statements(connection)
+    rows = [(pk, *(fold(value) for value in fields)) for pk, *fields in rows]
+    if not rows:
+        return 0
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for start in range(0, len(rows), CHUNK_SIZE):
+            chunk = rows[start:start + CHUNK_SIZE]
+            cursor.execute(sql['delete'].format(ids=', '.join(['%s'] * len(chunk))), [row[0] for row in chunk])
+        cursor.executemany(sql['insert'], rows)
+    return len(rows)
+
+
+def index(products):
+    """(Ré)indexe des produits (catégorie chargée de préférence par select_related)"""
+    return write([
+        (product.pk, product.name, product.code, product.category.name, product.description)
+        for product in products
+    ])
+
+
+def remove(product_ids):
+    product_ids = list(product_ids)
+    if product_ids:
+        with default_connection.cursor() as cursor:
+            cursor.execute(statements()['delete'].format(ids=', '.join(['%s'] * len(product_ids))), product_ids)
+
+
+def rebuild(batch_size=1000):
+    """Réindexe tous les produits, batch_size par transaction ; retourne le nombre de produits"""
+    count = last = 0
+    while True:
+        batch = list(
+            Product.objects.filter(pk__gt=last).order_by('pk')
+            .values_list('pk', 'name', 'code', 'category__name', 'description')[:batch_size]
+        )
+        if not batch:
+            return count
+        write(batch)
+        count += len(batch)
+        last = batch[-1][0]
+
+
+def match_expression(query):
+    """Requête du moteur pour query (chaque mot en préfixe), None si aucun mot exploitable"""
+    found = [word for word in dict.fromkeys(words(query)) if len(word) >= MIN_TERM_LENGTH][:MAX_TERMS]
+    if not found:
+        return None
+    # Mots réduits à [a-z0-9]+ par words() : rien à échapper
+    if default_connection.vendor == 'postgresql':
+        return ' & '.join(f'{word}:*' for word in found)
+    return ' '.join(f'"{word}"*' for word in found)
+
+
+def filter_products(queryset, query):
+    """Produits de queryset correspondant à query ; aucun si pas de mot exploitable"""
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(statements()['match'], [expression]))
+
+
+def ranked(queryset, query, limit=10):
+    """Les limit produits de queryset les plus pertinents pour query, dans l'ordre"""
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    with default_connection.cursor() as cursor:
+        cursor.execute(statements()['ranked'], [expression, CANDIDATES])
+        candidates = [row[0] for row in cursor.fetchall()]
+    # Restriction à queryset (produits actifs, catégorie...) par clé primaire,
+    # puis chargement des seuls limit premiers
+    allowed = set(queryset.filter(pk__in=candidates).values_list('pk', flat=True))
+    ids = [pk for pk in candidates if pk in allowed][:limit]
+    if len(ids) < limit and len(candidates) == CANDIDATES:
+        # Candidats tronqués, en majorité hors de queryset : on complète sans classement
+        ids += list(
+            filter_products(queryset, query).exclude(pk__in=ids)
+            .values_list('pk', flat=True)[:limit - len(ids)]
+        )
+    products = queryset.in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
@@ -0,0 +1,31 @@
+# sfs_products/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from sfs_products import catalogue, search
+from sfs_products.models import Product, ProductCategory
+
+
+@receiver([post_save, post_delete], sender=Product, dispatch_uid='catalogue_product')
+@receiver([post_save, post_delete], sender=ProductCategory, dispatch_uid='catalogue_category')
+def invalidate_catalogue(sender, **kwargs):
+    # Après validation : périmé plus tôt, le cache serait rempli à nouveau avec l'ancien catalogue
+    transaction.on_commit(catalogue.invalidate)
+
+
+@receiver(post_save, sender=Product, dispatch_uid='search_product')
+def index_product(sender, instance, **kwargs):
+    search.index([instance])
+
+
+@receiver(post_delete, sender=Product, dispatch_uid='search_product_delete')
+def unindex_product(sender, instance, **kwargs):
+    search.remove([instance.pk])
+
+
+@receiver(post_save, sender=ProductCategory, dispatch_uid='search_category')
+def index_category(sender, instance, created, **kwargs):
+    # Nom de catégorie indexé avec chacun de ses produits
+    if not created:
+        search.index(instance.products.select_related('category'))
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SfsSalesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sfs_sales'
+
+    def ready(self):
+        from sfs_sales import signals  # noqa: F401
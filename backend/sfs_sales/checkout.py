@@ -0,0 +1,220 @@
+# sfs_sales/checkout.py
+"""Encaissement d'un panier en requêtes groupées.
+
+Le nombre de requêtes reste constant quelle que soit la taille du panier :
+lignes et mouvements insérés en bulk, stocks résolus en une requête et
+décrémentés en un seul UPDATE, agrégats de ventes en un upsert par table
+(lots découpés seulement à la limite de paramètres de la base).
+
+Les commandes web restent en attente (PENDING) jusqu'au paiement : leur
+stock est réservé (sfs_inventory.reservations), puis converti en sorties
+par confirm_order, ou rendu par cancel_order et par le balayage des
+réservations expirées (commande release_reservations).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Prefetch, Value, When
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+
+from sfs_customers import loyalty
+from sfs_customers.models import Customer, LoyaltyCard, LoyaltyTransaction
+from sfs_inventory import ledger, reservations
+from sfs_inventory.models import Stock, StockMovement
+from sfs_sales import numbering, rollups
+from sfs_sales.models import Sale, SaleLine
+
+CENT = Decimal('0.01')
+
+
+def build_lines(sale, lines_data):
+    """Construit les SaleLine en mémoire (prix et TVA par défaut du produit)"""
+    lines = []
+    for line_data in lines_data:
+        product = line_data['product']
+        line = SaleLine(
+            sale=sale,
+            product=product,
+            quantity=line_data['quantity'],
+            unit_price=line_data.get('unit_price', product.base_price),
+            vat_rate=line_data.get('vat_rate', product.vat_rate),
+            discount_percent=line_data.get('discount_percent', Decimal('0')),
+        )
+        lines.append(line)
+    return lines
+
+
+def set_totals(sale, lines):
+    """Totaux de la vente, chacun arrondi au centime comme lors de l'écriture en base"""
+    subtotal = sum((line.line_total for line in lines), Decimal('0'))
+    vat_amount = sum((line.vat_amount for line in lines), Decimal('0'))
+    sale.subtotal = subtotal.quantize(CENT)
+    sale.vat_amount = vat_amount.quantize(CENT)
+    sale.total = (subtotal + vat_amount).quantize(CENT)
+
+
+def basket_stocks(baskets):
+    """[(vente, stock, quantité)] d'une liste de (vente, lignes), 1 SELECT"""
+    wanted = {}
+    for index, (sale, lines) in enumerate(baskets):
+        for line in lines:
+            key = (index, line.product_id)
+            wanted[key] = wanted.get(key, Decimal('0')) + abs(line.quantity)
+    if not wanted:
+        return []
+
+    stocks = Stock.objects.filter(
+        location_id__in={sale.location_id for sale, _ in baskets},
+        product_id__in={product_id for _, product_id in wanted},
+    ).only('pk', 'product_id', 'location_id')
+    stocks = {(stock.location_id, stock.product_id): stock for stock in stocks}
+    found = []
+    for (index, product_id), quantity in wanted.items():
+        sale = baskets[index][0]
+        stock = stocks.get((sale.location_id, product_id))
+        if stock is not None:
+            found.append((sale, stock, quantity))
+    return found
+
+
+def decrement_stocks(baskets, oversell=None):
+    """Sorties de stock d'une liste de (vente, lignes) : 1 SELECT, 1 INSERT groupé, 1 UPDATE"""
+    movements = [
+        StockMovement(
+            stock=stock, movement_type='OUT', quantity=quantity,
+            reference=sale.sale_number, note=f"Vente {sale.channel}",
+        )
+        for sale, stock, quantity in basket_stocks(baskets)
+    ]
+    return ledger.record_movements(movements, oversell=oversell)
+
+
+def reserve_stocks(sale, lines):
+    """Réserve le stock d'une commande en attente (refus si indisponible)"""
+    quantities = {stock.pk: quantity for _, stock, quantity in basket_stocks([(sale, lines)])}
+    return reservations.reserve(quantities, sale.sale_number)
+
+
+def fulfil(sale, lines, oversell=None):
+    """Sorties de stock d'une commande confirmée : réservations converties,
+    sortie classique pour les lignes dont la réservation a expiré"""
+    converted = reservations.confirm(sale.sale_number, note=f"Vente {sale.channel}", oversell=oversell)
+    covered = {row.stock_id for row in converted}
+    remaining = [
+        StockMovement(
+            stock=stock, movement_type='OUT', quantity=quantity,
+            reference=sale.sale_number, note=f"Vente {sale.channel}",
+        )
+        for _, stock, quantity in basket_stocks([(sale, lines)]) if stock.pk not in covered
+    ]
+    ledger.record_movements(remaining, oversell=oversell)
+
+
+def settle(sale, previous_status):
+    """Réservations d'une commande annulée par modification (à appeler dans une transaction).
+
+    La confirmation ne passe que par confirm_order, le serializer refuse
+    PENDING -> COMPLETED / CONFIRMED.
+    """
+    if previous_status == 'PENDING' and sale.status == 'CANCELLED':
+        reservations.release(sale.sale_number)
+
+
+def confirm_order(sale):
+    """Commande en attente payée : PENDING -> COMPLETED, une seule fois.
+
+    Retourne False si la commande n'était plus en attente (déjà confirmée,
+    annulée, ou expirée par le balayage).
+    """
+    with transaction.atomic():
+        if not Sale.objects.filter(pk=sale.pk, status='PENDING').update(status='COMPLETED', is_paid=True):
+            return False
+        sale.status, sale.is_paid = 'COMPLETED', True
+        lines = list(sale.lines.all())
+        fulfil(sale, lines)
+        credit_loyalty([sale])
+        rollups.apply([(sale, lines)])
+    return True
+
+
+def cancel_order(sale):
+    """Commande en attente annulée : réservations libérées"""
+    with transaction.atomic():
+        if not Sale.objects.filter(pk=sale.pk, status='PENDING').update(status='CANCELLED'):
+            return False
+        sale.status = 'CANCELLED'
+        reservations.release(sale.sale_number)
+    return True
+
+
+def cancel_expired(sale_numbers):
+    """Annule les commandes en attente dont la réservation a expiré"""
+    return Sale.objects.filter(sale_number__in=sale_numbers, status='PENDING').update(status='CANCELLED')
+
+
+def credit_loyalty(sales):
+    """Crédite points fidélité et date du dernier achat : 1 SELECT, 1 INSERT et 2 UPDATE pour tout le lot"""
+    last_purchase = {}
+    for sale in sales:
+        if not sale.customer_id or not sale.is_paid:
+            continue
+        customer_id = sale.customer_id
+        if customer_id not in last_purchase or sale.created_at > last_purchase[customer_id]:
+            last_purchase[customer_id] = sale.created_at
+    if not last_purchase:
+        return {}
+
+    Customer.objects.filter(pk__in=last_purchase).update(
+        last_purchase_date=Case(
+            *[When(pk=pk, then=Value(date)) for pk, date in last_purchase.items()],
+            output_field=DateTimeField(),
+        ),
+        updated_at=timezone.now(),
+    )
+    cards = dict(LoyaltyCard.objects.filter(customer_id__in=last_purchase).values_list('customer_id', 'pk'))
+    # Une ligne de journal par vente, les cartes partagées sont cumulées dans l'UPDATE.
+    # Un remboursement (total négatif) ne gagne ni ne retire de points
+    transactions = [
+        LoyaltyTransaction(
+            card_id=cards[sale.customer_id], kind='EARN', reference=sale.sale_number,
+            points=LoyaltyCard.points_for_amount(sale.total),
+        )
+        for sale in sales
+        if sale.customer_id in cards and sale.is_paid
+    ]
+    transactions = [entry for entry in transactions if entry.points > 0]
+    points = {}
+    for entry in loyalty.record(transactions):
+        points[entry.card_id] = points.get(entry.card_id, 0) + entry.points
+    return points
+
+
+def checkout(lines_data, **sale_data):
+    """Crée une vente avec ses lignes, sorties (ou réservations) de stock et points fidélité"""
+    # Commande web : en attente de paiement, le stock est réservé
+    web = sale_data.get('channel') == 'WEB'
+    sale_data.setdefault('is_paid', not web)
+    sale_data.setdefault('status', 'PENDING' if web else 'COMPLETED')
+    sale = Sale(**sale_data)
+    # Numéro attribué hors transaction pour profiter des blocs réservés
+    sale.sale_number = numbering.next_sale_number(sale.location_id, sale.channel)
+
+    lines = build_lines(sale, lines_data)
+    set_totals(sale, lines)
+    with transaction.atomic():
+        sale.save()
+        SaleLine.objects.bulk_create(lines)
+        if sale.status == 'PENDING':
+            reserve_stocks(sale, lines)
+        else:
+            decrement_stocks([(sale, lines)])
+        credit_loyalty([sale])
+        if sale.status == 'COMPLETED':
+            rollups.apply([(sale, lines)])
+
+    # Réponse sérialisée sans requête par ligne
+    prefetch_related_objects(
+        [sale], Prefetch('lines', queryset=SaleLine.objects.select_related('product'))
+    )
+    return sale
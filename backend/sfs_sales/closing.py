@@ -0,0 +1,77 @@
+# sfs_sales/closing.py
+"""Clôture de caisse : génération des DailyReport.
+
+Une seule requête groupée par (jour, lieu) couvre tous les stands et toute
+la période demandée, qu'il s'agisse de la clôture du soir ou d'un rattrapage
+de plusieurs mois. Les rapports déjà validés ne sont jamais réécrits.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from sfs_sales.models import DailyReport, Sale
+
+COMPUTED_FIELDS = ['total_sales_count', 'total_revenue', 'total_cash', 'total_card', 'expected_cash', 'updated_at']
+
+
+def day_totals(start, end, locations=None):
+    """{(jour, lieu): agrégats} des ventes complétées entre start et end inclus"""
+    lower = timezone.make_aware(datetime.combine(start, time.min))
+    upper = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+    sales = Sale.objects.filter(status='COMPLETED', created_at__gte=lower, created_at__lt=upper)
+    if locations:
+        sales = sales.filter(location__in=locations)
+    rows = (
+        sales.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'location_id')
+        .annotate(
+            count=Count('pk'),
+            revenue=Sum('total'),
+            cash=Sum('total', filter=Q(payment_method='CASH')),
+            card=Sum('total', filter=Q(payment_method='CARD')),
+        )
+    )
+    return {(row['day'], row['location_id']): row for row in rows}
+
+
+@transaction.atomic
+def close_days(start, end=None, locations=None):
+    """Crée ou met à jour les rapports journaliers de [start, end] ; retourne leur nombre"""
+    end = end or start
+    totals = day_totals(start, end, locations)
+    existing = DailyReport.objects.filter(date__range=(start, end))
+    if locations:
+        existing = existing.filter(location__in=locations)
+    validated = set()
+    for day, location_id, is_validated in existing.values_list('date', 'location_id', 'is_validated'):
+        if is_validated:
+            validated.add((day, location_id))
+        else:
+            # Rapport devenu vide (ventes annulées) : remis à zéro
+            totals.setdefault((day, location_id), {'count': 0, 'revenue': None, 'cash': None, 'card': None})
+
+    zero = Decimal('0')
+    reports = []
+    for (day, location_id), row in totals.items():
+        if (day, location_id) in validated:
+            continue
+        cash = row['cash'] or zero
+        reports.append(DailyReport(
+            date=day, location_id=location_id,
+            total_sales_count=row['count'],
+            total_revenue=row['revenue'] or zero,
+            total_cash=cash,
+            total_card=row['card'] or zero,
+            # Pas de fond de caisse enregistré : le tiroir doit contenir les ventes espèces
+            expected_cash=cash,
+        ))
+    DailyReport.objects.bulk_create(
+        reports, batch_size=500,
+        update_conflicts=True, unique_fields=['date', 'location'], update_fields=COMPUTED_FIELDS,
+    )
+    return len(reports)
@@ -0,0 +1,74 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from sfs_inventory.models import StockLocation
+from sfs_sales.models import Sale
+from sfs_sales.numbering import SaleNumberAllocator
+
+
+class Command(BaseCommand):
+    help = "Benchmark : attribution parallèle de numéros de vente, vérification d'unicité"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='Caisses simulées (un allocateur chacune)')
+        parser.add_argument('--sales', type=int, default=1000, help='Numéros par caisse')
+        parser.add_argument('--locations', type=int, default=4)
+        parser.add_argument('--block-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:6].upper()
+        locations = [
+            StockLocation.objects.create(code=f'B{tag}{i}', name='Benchmark', is_active=False)
+            for i in range(options['locations'])
+        ]
+        channels = [code for code, _ in Sale.CHANNELS]
+        numbers, unordered, retries = [], [], [0]
+        mutex = threading.Lock()
+
+        def worker(index):
+            # Chaque caisse a son propre allocateur, comme un processus distinct
+            allocator = SaleNumberAllocator(block_size=options['block_size'])
+            location = locations[index % len(locations)]
+            channel = channels[index % len(channels)]
+            produced = []
+            try:
+                while len(produced) < options['sales']:
+                    try:
+                        produced.extend(allocator.allocate(location.pk, channel))
+                    except OperationalError:
+                        retries[0] += 1
+                        time.sleep(0.001)
+            finally:
+                connection.close()
+            with mutex:
+                numbers.extend(produced)
+                if produced != sorted(produced):
+                    unordered.append(index)
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(options['workers'])]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        for location in locations:
+            location.delete()
+
+        expected = options['workers'] * options['sales']
+        self.stdout.write(
+            f"{len(numbers)} numéros en {elapsed:.2f}s ({len(numbers) / elapsed:.0f}/s), "
+            f"{retries[0]} reprises, exemple {numbers[0] if numbers else '-'}"
+        )
+        if len(numbers) != expected:
+            raise CommandError(f"{expected - len(numbers)} numéros manquants")
+        if unordered:
+            raise CommandError(f"Numéros non monotones pour les caisses {unordered}")
+        if len(set(numbers)) != len(numbers):
+            raise CommandError(f"{len(numbers) - len(set(numbers))} collisions")
+        self.stdout.write(self.style.SUCCESS("Aucune collision"))
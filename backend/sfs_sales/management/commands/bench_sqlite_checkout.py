@@ -0,0 +1,156 @@
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+
+from sfs_inventory import ledger
+from sfs_inventory.models import Stock, StockLocation
+from sfs_products.models import Product, ProductCategory
+from sfs_sales import numbering
+from sfs_sales.checkout import checkout
+from sfs_sales.models import Sale
+
+PROFILES = {
+    # Backend Django d'origine : journal rollback, BEGIN différé, timeout 5 s
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}},
+    'tuned': {'ENGINE': 'verger.sqlite', 'OPTIONS': {}},
+}
+
+
+def kiosk(queue, stocks, location, sales, lines, intake):
+    """Une caisse : sales encaissements de lines produits tirés au hasard.
+
+    Une fraction intake des opérations est une réception de marchandise
+    (mouvement verrouillé : lecture puis écriture dans la même transaction).
+    """
+    rng = random.Random()
+    products = [stock.product for stock in stocks]
+    latencies, locked = [], 0
+    try:
+        for _ in range(sales):
+            if rng.random() < intake:
+                try:
+                    ledger.move(rng.choice(stocks), 'IN', Decimal('1'), reference='BENCH', lock=True)
+                except OperationalError:
+                    locked += 1
+            basket = [{'product': product, 'quantity': Decimal('1')} for product in rng.sample(products, lines)]
+            while True:
+                started = time.perf_counter()
+                try:
+                    checkout(basket, channel='KIOSK', location=location, payment_method='CASH')
+                except OperationalError:
+                    # « database is locked » : la caisse recommence l'encaissement
+                    locked += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                break
+    finally:
+        connection.close()
+        queue.put((latencies, locked))
+
+
+def reader(queue, stop):
+    """Tableau de bord / boutique en ligne : lectures en continu pendant les ventes"""
+    reads, locked = 0, 0
+    try:
+        while not stop.is_set():
+            try:
+                list(Stock.objects.select_related('product')[:100])
+                Sale.objects.aggregate(revenue=Sum('total'))
+            except OperationalError:
+                locked += 1
+                continue
+            reads += 1
+    finally:
+        connection.close()
+        queue.put((reads, locked))
+
+
+class Command(BaseCommand):
+    help = ("Benchmark : encaissements concurrents de plusieurs caisses sur SQLite, "
+            "backend Django d'origine contre backend réglé (base temporaire)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kiosks', type=int, default=8, help='Caisses simultanées (processus)')
+        parser.add_argument('--sales', type=int, default=50, help='Ventes par caisse')
+        parser.add_argument('--lines', type=int, default=3, help='Lignes par panier')
+        parser.add_argument('--readers', type=int, default=2, help='Processus de lecture simultanés')
+        parser.add_argument('--intake', type=float, default=0.2, help='Part des opérations en réception de stock')
+        parser.add_argument('--profile', choices=[*PROFILES, 'both'], default='both')
+
+    def handle(self, *args, **options):
+        profiles = list(PROFILES) if options['profile'] == 'both' else [options['profile']]
+        database = connections.settings['default']
+        saved = {key: database.get(key) for key in ('ENGINE', 'NAME', 'OPTIONS')}
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                for name in profiles:
+                    self.use_database(database, dict(PROFILES[name], NAME=os.path.join(directory, f'{name}.sqlite3')))
+                    self.report(name, self.run(options))
+        finally:
+            self.use_database(database, saved)
+
+    def use_database(self, database, values):
+        connections.close_all()
+        database.update(values)
+        # Nouvelle connexion (et nouveaux blocs de numéros) pour la base suivante
+        del connections['default']
+        numbering.allocator = numbering.SaleNumberAllocator()
+
+    def run(self, options):
+        call_command('migrate', verbosity=0)
+        category = ProductCategory.objects.create(name='Bench')
+        location = StockLocation.objects.create(code='BENCH', name='Bench')
+        products = [
+            Product.objects.create(code=f'B{i}', name=f'Bench {i}', category=category, base_price=Decimal('2.50'))
+            for i in range(20)
+        ]
+        stocks = Stock.objects.bulk_create([Stock(product=p, location=location, quantity=100000) for p in products])
+        connection.close()
+
+        # Un processus par caisse, comme des workers gunicorn : des threads
+        # passeraient leur temps à attendre le GIL plutôt que la base
+        context = multiprocessing.get_context('fork')
+        queue, reads_queue, stop = context.Queue(), context.Queue(), context.Event()
+        readers = [context.Process(target=reader, args=(reads_queue, stop)) for _ in range(options['readers'])]
+        kiosks = [
+            context.Process(target=kiosk, args=(queue, stocks, location, options['sales'], options['lines'], options['intake']))
+            for _ in range(options['kiosks'])
+        ]
+        started = time.perf_counter()
+        for process in readers + kiosks:
+            process.start()
+        results = [queue.get() for _ in kiosks]
+        elapsed = time.perf_counter() - started
+        stop.set()
+        reads = [reads_queue.get() for _ in readers]
+        for process in readers + kiosks:
+            process.join()
+
+        latencies = sorted(latency for kiosk_latencies, _ in results for latency in kiosk_latencies)
+        return {
+            'sales': len(latencies),
+            'locked': sum(locked for _, locked in results) + sum(locked for _, locked in reads),
+            'reads': sum(count for count, _ in reads),
+            'elapsed': elapsed,
+            'latencies': latencies,
+        }
+
+    def report(self, name, result):
+        latencies = result['latencies']
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        self.stdout.write(
+            f"{name:8} {result['sales']} ventes en {result['elapsed']:.2f}s "
+            f"({result['sales'] / result['elapsed']:.0f}/s) - "
+            f"médiane {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms, "
+            f"{result['reads'] / result['elapsed']:.0f} lectures/s, "
+            f"échecs « database is locked » {result['locked']}"
+        )
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from sfs_inventory.models import StockLocation
+from sfs_sales.closing import close_days
+
+
+class Command(BaseCommand):
+    help = "Génère les rapports journaliers de tous les lieux (clôture ou rattrapage)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Jour à clôturer (AAAA-MM-JJ), défaut : aujourd'hui")
+        parser.add_argument('--start', help='Début du rattrapage (AAAA-MM-JJ)')
+        parser.add_argument('--end', help='Fin du rattrapage (AAAA-MM-JJ), défaut : hier')
+        parser.add_argument('--location', action='append', help='Code de lieu (répétable)')
+
+    def parse(self, value):
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Date invalide : {value}")
+        return day
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['start']:
+            start = self.parse(options['start'])
+            end = self.parse(options['end']) if options['end'] else today - timedelta(days=1)
+        else:
+            start = end = self.parse(options['date']) if options['date'] else today
+        if start > end:
+            raise CommandError("--start doit précéder --end")
+
+        locations = None
+        if options['location']:
+            locations = list(StockLocation.objects.filter(code__in=options['location']))
+            if len(locations) != len(set(options['location'])):
+                raise CommandError("Lieu inconnu")
+
+        count = close_days(start, end, locations)
+        self.stdout.write(self.style.SUCCESS(f"{count} rapports générés du {start} au {end}"))
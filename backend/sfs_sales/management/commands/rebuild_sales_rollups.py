@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from sfs_sales import rollups
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les tables d'agrégats de ventes depuis les ventes brutes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Premier jour (AAAA-MM-JJ), défaut : première vente')
+        parser.add_argument('--end', help="Dernier jour (AAAA-MM-JJ), défaut : aujourd'hui")
+
+    def handle(self, *args, **options):
+        bounds = {}
+        for name in ('start', 'end'):
+            if options[name]:
+                bounds[name] = parse_date(options[name])
+                if bounds[name] is None:
+                    raise CommandError(f"Date invalide : {options[name]}")
+        count = rollups.rebuild(**bounds)
+        self.stdout.write(self.style.SUCCESS(f"{count} lignes d'agrégats reconstruites"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from sfs_inventory import reservations
+from sfs_sales.checkout import cancel_expired
+
+
+class Command(BaseCommand):
+    help = "Libère le stock des commandes web non payées à temps et les annule (à planifier toutes les minutes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Réservations par transaction')
+
+    def handle(self, *args, **options):
+        cancelled = []
+
+        def on_expired(sale_numbers):
+            cancelled.append(cancel_expired(sale_numbers))
+
+        count = reservations.sweep(batch_size=options['batch_size'], on_expired=on_expired)
+        self.stdout.write(f"{count} réservations expirées, {sum(cancelled)} commandes annulées")
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_inventory', '0001_initial'),
+        ('sfs_sales', '0002_sale_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('KIOSK', 'Kiosque'), ('MARKET', 'Marché'), ('WEB', 'Web'), ('SUBSCRIPTION', 'Abonnement')], max_length=20)),
+                ('day', models.DateField()),
+                ('last_value', models.IntegerField(default=0)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sfs_inventory.stocklocation')),
+            ],
+            options={
+                'db_table': 'sale_sequences',
+                'unique_together': {('location', 'channel', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_customers', '0001_initial'),
+        ('sfs_inventory', '0001_initial'),
+        ('sfs_sales', '0003_sale_sequences'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['status', 'created_at'], name='sales_status_created_idx'),
+        ),
+    ]
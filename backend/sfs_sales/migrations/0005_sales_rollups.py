@@ -0,0 +1,53 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_inventory', '0001_initial'),
+        ('sfs_products', '0001_initial'),
+        ('sfs_sales', '0004_sales_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('channel', models.CharField(choices=[('KIOSK', 'Kiosque'), ('MARKET', 'Marché'), ('WEB', 'Web'), ('SUBSCRIPTION', 'Abonnement')], max_length=20)),
+                ('lines_count', models.IntegerField(default=0)),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sfs_inventory.stocklocation')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sfs_products.product')),
+            ],
+            options={
+                'db_table': 'product_sales_rollups',
+                'indexes': [models.Index(fields=['day', 'product'], name='product_rollups_day_idx')],
+                'unique_together': {('day', 'location', 'channel', 'product')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('channel', models.CharField(choices=[('KIOSK', 'Kiosque'), ('MARKET', 'Marché'), ('WEB', 'Web'), ('SUBSCRIPTION', 'Abonnement')], max_length=20)),
+                ('payment_method', models.CharField(choices=[('CASH', 'Espèces'), ('CARD', 'Carte'), ('CHECK', 'Chèque'), ('ONLINE', 'En ligne')], max_length=20)),
+                ('sales_count', models.IntegerField(default=0)),
+                ('items_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('vat_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sfs_inventory.stocklocation')),
+            ],
+            options={
+                'db_table': 'sales_rollups',
+                'indexes': [models.Index(fields=['day', 'location'], name='sales_rollups_day_idx')],
+                'unique_together': {('day', 'location', 'channel', 'payment_method')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_inventory', '0001_initial'),
+        ('sfs_sales', '0005_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyreport',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyreport',
+            unique_together={('date', 'location')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_sales', '0006_daily_report_per_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyreport',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
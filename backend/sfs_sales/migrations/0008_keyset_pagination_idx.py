@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_customers', '0003_keyset_pagination_idx'),
+        ('sfs_inventory', '0005_keyset_pagination_idx'),
+        ('sfs_sales', '0007_dailyreport_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['created_at', 'id'], name='sales_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:30
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+BATCH_SIZE = 500
+
+
+def revenue_amount(quantity, unit_price, discount_percent, vat_rate):
+    # Copie de sfs_sales.rollups.revenue_amount (CA TTC arrondi au centime, ROUND_HALF_UP)
+    amount = quantity * unit_price * (100 - discount_percent) * (100 + vat_rate) / 10000
+    return amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def backfill(apps, schema_editor):
+    """Remplit sales_rollups et product_sales_rollups avec l'historique des ventes complétées"""
+    Sale = apps.get_model('sfs_sales', 'Sale')
+    SaleLine = apps.get_model('sfs_sales', 'SaleLine')
+    SalesRollup = apps.get_model('sfs_sales', 'SalesRollup')
+    ProductSalesRollup = apps.get_model('sfs_sales', 'ProductSalesRollup')
+    SalesRollup.objects.all().delete()
+    ProductSalesRollup.objects.all().delete()
+
+    items = (
+        SaleLine.objects.filter(sale=OuterRef('pk'))
+        .order_by().values('sale').annotate(n=Count('pk')).values('n')
+    )
+    sales = (
+        Sale.objects.filter(status='COMPLETED').order_by()
+        .annotate(day=TruncDate('created_at'))
+        .annotate(items=Coalesce(Subquery(items, output_field=IntegerField()), 0))
+        .values('day', 'location_id', 'channel', 'payment_method')
+        .annotate(
+            sales_count=Count('pk'), items_count=Sum('items'),
+            revenue=Sum('total'), vat_amount_sum=Sum('vat_amount'),
+        )
+    )
+    SalesRollup.objects.bulk_create([
+        SalesRollup(
+            day=row['day'], location_id=row['location_id'], channel=row['channel'],
+            payment_method=row['payment_method'], sales_count=row['sales_count'],
+            items_count=row['items_count'], revenue=row['revenue'],
+            vat_amount=row['vat_amount_sum'],
+        )
+        for row in sales.iterator()
+    ], batch_size=BATCH_SIZE)
+
+    lines = (
+        SaleLine.objects.filter(sale__status='COMPLETED').order_by()
+        .values_list(
+            'sale__created_at', 'sale__location_id', 'sale__channel', 'product_id',
+            'quantity', 'unit_price', 'discount_percent', 'vat_rate',
+        )
+    )
+    products = {}
+    for created_at, location_id, channel, product_id, quantity, *prices in lines.iterator(chunk_size=2000):
+        key = (timezone.localdate(created_at), location_id, channel, product_id)
+        row = products.setdefault(key, {'lines_count': 0, 'quantity': 0, 'revenue': 0})
+        row['lines_count'] += 1
+        row['quantity'] += quantity
+        row['revenue'] += revenue_amount(quantity, *prices)
+    ProductSalesRollup.objects.bulk_create([
+        ProductSalesRollup(day=day, location_id=location_id, channel=channel, product_id=product_id, **row)
+        for (day, location_id, channel, product_id), row in products.items()
+    ], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sfs_sales', '0008_keyset_pagination_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
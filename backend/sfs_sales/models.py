@@ -5,7 +5,6 @@ from decimal import Decimal
 from sfs_products.models import Product
 from sfs_customers.models import Customer
 from sfs_inventory.models import StockLocation
-from datetime import datetime
 from decimal import Decimal 
 
 class Sale(models.Model):
@@ -13,7 +12,10 @@ class Sale(models.Model):
     PAYMENT_METHODS = [('CASH', 'Espèces'), ('CARD', 'Carte'), ('CHECK', 'Chèque'), ('ONLINE', 'En ligne')]
     STATUS = [('PENDING', 'En attente'), ('CONFIRMED', 'Confirmée'), ('COMPLETED', 'Complétée'), ('CANCELLED', 'Annulée')]
     
+    CHANNEL_PREFIXES = {'KIOSK': 'K', 'MARKET': 'M', 'WEB': 'W', 'SUBSCRIPTION': 'S'}
+    
     sale_number = models.CharField(max_length=50, unique=True, editable=False)
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     channel = models.CharField(max_length=20, choices=CHANNELS)
     location = models.ForeignKey(StockLocation, on_delete=models.PROTECT)
     customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')
@@ -33,11 +35,15 @@ class Sale(models.Model):
     class Meta:
         db_table = 'sales'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='sales_status_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='sales_created_id_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.sale_number:
-            prefix = {'KIOSK': 'K', 'MARKET': 'M', 'WEB': 'W', 'SUBSCRIPTION': 'S'}.get(self.channel, 'X')
-            self.sale_number = f"{prefix}{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            from sfs_sales.numbering import next_sale_number
+            self.sale_number = next_sale_number(self.location_id, self.channel)
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -47,6 +53,17 @@ class Sale(models.Model):
     def items_count(self):
         return self.lines.count()
 
+class SaleSequence(models.Model):
+    """Dernier numéro de vente attribué par lieu, canal et jour"""
+    location = models.ForeignKey(StockLocation, on_delete=models.CASCADE)
+    channel = models.CharField(max_length=20, choices=Sale.CHANNELS)
+    day = models.DateField()
+    last_value = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'sale_sequences'
+        unique_together = ['location', 'channel', 'day']
+
 class SaleLine(models.Model):
     sale = models.ForeignKey(Sale, on_delete=models.CASCADE, related_name='lines')
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
@@ -68,7 +85,7 @@ class SaleLine(models.Model):
         return self.line_total * (self.vat_rate / 100)
 
 class DailyReport(models.Model):
-    date = models.DateField(unique=True)
+    date = models.DateField()
     location = models.ForeignKey(StockLocation, on_delete=models.PROTECT)
     total_sales_count = models.IntegerField(default=0)
     total_revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -78,11 +95,45 @@ class DailyReport(models.Model):
     actual_cash = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     is_validated = models.BooleanField(default=False)
     notes = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'daily_reports'
         ordering = ['-date']
+        unique_together = ['date', 'location']
     
     @property
     def cash_difference(self):
         return self.actual_cash - self.expected_cash
+
+
+class SalesRollup(models.Model):
+    """Ventes complétées agrégées par jour, lieu, canal et moyen de paiement"""
+    day = models.DateField()
+    location = models.ForeignKey(StockLocation, on_delete=models.CASCADE)
+    channel = models.CharField(max_length=20, choices=Sale.CHANNELS)
+    payment_method = models.CharField(max_length=20, choices=Sale.PAYMENT_METHODS)
+    sales_count = models.IntegerField(default=0)
+    items_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    vat_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'sales_rollups'
+        unique_together = ['day', 'location', 'channel', 'payment_method']
+        indexes = [models.Index(fields=['day', 'location'], name='sales_rollups_day_idx')]
+
+class ProductSalesRollup(models.Model):
+    """Quantités et CA TTC par jour, lieu, canal et produit"""
+    day = models.DateField()
+    location = models.ForeignKey(StockLocation, on_delete=models.CASCADE)
+    channel = models.CharField(max_length=20, choices=Sale.CHANNELS)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    lines_count = models.IntegerField(default=0)
+    quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'product_sales_rollups'
+        unique_together = ['day', 'location', 'channel', 'product']
+        indexes = [models.Index(fields=['day', 'product'], name='product_rollups_day_idx')]
@@ -0,0 +1,80 @@
+# sfs_sales/numbering.py
+"""Attribution des numéros de vente.
+
+Format : <canal><AAAAMMJJ>-<lieu>-<séquence>, par exemple K20260118-3-000042.
+La séquence est propre à chaque (lieu, canal, jour) et réservée par blocs :
+un processus ne touche la table sale_sequences qu'une fois par bloc, puis
+distribue les numéros en mémoire.
+"""
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from sfs_sales.models import Sale, SaleSequence
+
+
+def format_sale_number(channel, day, location_id, value):
+    prefix = Sale.CHANNEL_PREFIXES.get(channel, 'X')
+    return f"{prefix}{day:%Y%m%d}-{location_id}-{value:06d}"
+
+
+def reserve(location_id, channel, day, count):
+    """Réserve count valeurs consécutives en base, retourne la première"""
+    lookup = {'location_id': location_id, 'channel': channel, 'day': day}
+    with transaction.atomic():
+        updated = SaleSequence.objects.filter(**lookup).update(last_value=F('last_value') + count)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    SaleSequence.objects.create(last_value=count, **lookup)
+                return 1
+            except IntegrityError:
+                # Créée entre-temps par un autre processus
+                SaleSequence.objects.filter(**lookup).update(last_value=F('last_value') + count)
+        last_value = SaleSequence.objects.filter(**lookup).values_list('last_value', flat=True).get()
+    return last_value - count + 1
+
+
+class SaleNumberAllocator:
+    """Distribue les numéros d'un bloc réservé, sans aller en base à chaque vente"""
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size or getattr(settings, 'SALE_NUMBER_BLOCK_SIZE', 20)
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, location_id, channel, count=1):
+        """Retourne count numéros de vente pour ce lieu et ce canal"""
+        day = timezone.localdate()
+        key = (location_id, channel, day)
+        if connection.in_atomic_block:
+            # Un bloc réservé ici serait annulé avec la transaction appelante
+            # alors que d'autres ventes l'auraient déjà utilisé : pas de cache.
+            first = reserve(location_id, channel, day, count)
+            return [format_sale_number(channel, day, location_id, first + i) for i in range(count)]
+
+        values = []
+        with self._lock:
+            while len(values) < count:
+                start, end = self._blocks.get(key, (0, 0))
+                if start >= end:
+                    size = max(self.block_size, count - len(values))
+                    start = reserve(location_id, channel, day, size)
+                    end = start + size
+                taken = min(end - start, count - len(values))
+                values.extend(range(start, start + taken))
+                self._blocks[key] = (start + taken, end)
+            # Les blocs des jours précédents ne serviront plus
+            for stale in [k for k in self._blocks if k[2] != day]:
+                del self._blocks[stale]
+        return [format_sale_number(channel, day, location_id, value) for value in values]
+
+
+allocator = SaleNumberAllocator()
+
+
+def next_sale_number(location_id, channel):
+    return allocator.allocate(location_id, channel)[0]
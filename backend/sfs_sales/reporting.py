@@ -0,0 +1,238 @@
+# sfs_sales/reporting.py
+"""Agrégats de ventes pour le tableau de bord."""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from sfs_sales.models import ProductSalesRollup, Sale, SaleLine, SalesRollup
+from sfs_sales.rollups import day_bounds
+
+GRANULARITIES = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+ROLLUP_GRANULARITIES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+ROLLUP_PARAMS = {'start', 'end', 'granularity', 'channel', 'location', 'format'}
+DEFAULT_PERIOD_DAYS = 30
+
+
+def parse_bound(value, end=False):
+    """Date ou date-heure ISO vers un datetime aware (une date de fin est incluse)"""
+    if not value:
+        return None
+    # parse_datetime accepte aussi une date seule (minuit) : les dates d'abord
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is not None:
+        if end:
+            day += timedelta(days=1)
+        moment = datetime.combine(day, time.min)
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(f"Date invalide : {value}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def day_range(start=None, end=None):
+    """Jours [start, end] (dates ISO), par défaut les DEFAULT_PERIOD_DAYS derniers jours"""
+    days = []
+    for value in (start, end):
+        day = parse_date(value) if value else None
+        if value and day is None:
+            raise ValueError(f"Date invalide : {value}")
+        days.append(day)
+    start, end = days
+    end = end or timezone.localdate()
+    start = start or end - timedelta(days=DEFAULT_PERIOD_DAYS)
+    if start > end:
+        raise ValueError("start doit précéder end")
+    return start, end
+
+
+def period_bounds(start=None, end=None):
+    """Période demandée, par défaut les DEFAULT_PERIOD_DAYS derniers jours"""
+    end = parse_bound(end, end=True) or timezone.now()
+    start = parse_bound(start) or end - timedelta(days=DEFAULT_PERIOD_DAYS)
+    if start >= end:
+        raise ValueError("start doit précéder end")
+    return start, end
+
+
+def breakdown(sales):
+    """Ventilation canal / paiement / lieu en une seule requête groupée"""
+    return fold_breakdown(
+        sales.order_by()
+        .values('channel', 'payment_method', 'location_id', 'location__name')
+        .annotate(count=Count('pk'), revenue=Sum('total'), vat=Sum('vat_amount'))
+    )
+
+
+def fold_breakdown(rows):
+    channel_labels = dict(Sale.CHANNELS)
+    payment_labels = dict(Sale.PAYMENT_METHODS)
+    totals = {'count': 0, 'revenue': Decimal('0'), 'vat': Decimal('0')}
+    groups = {'channel': {}, 'payment_method': {}, 'location': {}}
+
+    for row in rows:
+        keys = {
+            'channel': (row['channel'], channel_labels.get(row['channel'], row['channel'])),
+            'payment_method': (row['payment_method'], payment_labels.get(row['payment_method'], row['payment_method'])),
+            'location': (row['location_id'], row['location__name']),
+        }
+        for dimension, (code, label) in keys.items():
+            bucket = groups[dimension].setdefault(code, {
+                'code': code, 'label': label, 'count': 0, 'revenue': Decimal('0'),
+            })
+            bucket['count'] += row['count']
+            bucket['revenue'] += row['revenue'] or 0
+        totals['count'] += row['count']
+        totals['revenue'] += row['revenue'] or 0
+        totals['vat'] += row['vat'] or 0
+
+    return totals, {
+        dimension: sorted(buckets.values(), key=lambda b: b['revenue'], reverse=True)
+        for dimension, buckets in groups.items()
+    }
+
+
+def time_series(sales, granularity='day'):
+    """CA, TVA et taille de panier par tranche de temps"""
+    trunc = GRANULARITIES[granularity]
+    items = (
+        SaleLine.objects.filter(sale=OuterRef('pk'))
+        .order_by().values('sale').annotate(n=Count('pk')).values('n')
+    )
+    return fold_series(
+        sales.order_by()
+        .annotate(items=Coalesce(Subquery(items, output_field=IntegerField()), 0))
+        .annotate(period=trunc('created_at'))
+        .values('period')
+        .annotate(count=Count('pk'), revenue=Sum('total'), vat=Sum('vat_amount'), lines=Sum('items'))
+        .order_by('period')
+    )
+
+
+def fold_series(rows):
+    series = []
+    for row in rows:
+        revenue = row['revenue'] or Decimal('0')
+        period = row['period']
+        if not isinstance(period, datetime):
+            # Tranche d'agrégats journaliers : même type que TruncDay sur created_at
+            period = timezone.make_aware(datetime.combine(period, time.min))
+        series.append({
+            'period': period,
+            'count': row['count'],
+            'revenue': float(revenue),
+            'vat': float(row['vat'] or 0),
+            'average_basket': round(float(revenue) / row['count'], 2),
+            'average_items': round((row['lines'] or 0) / row['count'], 2),
+        })
+    return series
+
+
+def summarize(start, end, granularity, totals, groups, series):
+    for buckets in groups.values():
+        for bucket in buckets:
+            bucket['revenue'] = float(bucket['revenue'])
+    counts_by_channel = {bucket['code']: bucket['count'] for bucket in groups['channel']}
+    return {
+        'start': start,
+        'end': end,
+        'granularity': granularity,
+        'total_sales': totals['count'],
+        'total_revenue': float(totals['revenue']),
+        'total_vat': float(totals['vat']),
+        'by_channel': {label: counts_by_channel.get(code, 0) for code, label in Sale.CHANNELS},
+        'by_payment_method': groups['payment_method'],
+        'by_location': groups['location'],
+        'channels': groups['channel'],
+        'series': series,
+    }
+
+
+def sales_statistics(sales, start=None, end=None, granularity='day'):
+    """Statistiques calculées sur les ventes brutes (toute granularité, tout filtre)"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity doit valoir {', '.join(GRANULARITIES)}")
+    start, end = period_bounds(start, end)
+    sales = sales.filter(status='COMPLETED', created_at__gte=start, created_at__lt=end)
+    totals, groups = breakdown(sales)
+    return summarize(start, end, granularity, totals, groups, time_series(sales, granularity))
+
+
+def can_use_rollups(params):
+    """Vrai si la demande se résout sur les agrégats journaliers"""
+    if params.get('granularity', 'day') not in ROLLUP_GRANULARITIES:
+        return False
+    if set(params) - ROLLUP_PARAMS:
+        return False
+    try:
+        return all(parse_date(params[name]) for name in ('start', 'end') if params.get(name))
+    except ValueError:
+        return False
+
+
+def rollup_statistics(start=None, end=None, granularity='day', channel=None, location=None):
+    """Mêmes statistiques, lues dans sales_rollups : coût indépendant de l'historique"""
+    start, end = day_range(start, end)
+    rows = SalesRollup.objects.filter(day__range=(start, end))
+    if channel:
+        rows = rows.filter(channel=channel)
+    if location:
+        rows = rows.filter(location_id=location)
+
+    totals, groups = fold_breakdown(
+        rows.values('channel', 'payment_method', 'location_id', 'location__name')
+        .annotate(count=Sum('sales_count'), revenue=Sum('revenue'), vat=Sum('vat_amount'))
+    )
+    series = fold_series(
+        rows.annotate(period=ROLLUP_GRANULARITIES[granularity]('day'))
+        .values('period')
+        .annotate(count=Sum('sales_count'), revenue=Sum('revenue'), vat=Sum('vat_amount'),
+                  lines=Sum('items_count'))
+        .order_by('period')
+    )
+    # Bornes au format de sales_statistics : début inclus, fin exclue
+    start, end = day_bounds(start, end)
+    return summarize(start, end, granularity, totals, groups, series)
+
+
+def top_products(start=None, end=None, channel=None, location=None, limit=20):
+    """Produits les plus vendus sur la période, depuis product_sales_rollups"""
+    start, end = day_range(start, end)
+    rows = ProductSalesRollup.objects.filter(day__range=(start, end))
+    if channel:
+        rows = rows.filter(channel=channel)
+    if location:
+        rows = rows.filter(location_id=location)
+    rows = (
+        rows.values('product_id', 'product__name')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'), lines=Sum('lines_count'))
+        .order_by('-revenue')[:limit]
+    )
+    return [
+        {
+            'product': row['product_id'],
+            'product_name': row['product__name'],
+            'quantity': float(row['quantity']),
+            'revenue': float(row['revenue']),
+            'lines': row['lines'],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,235 @@
+# sfs_sales/rollups.py
+"""Tables d'agrégats de ventes tenues à jour au fil de l'eau.
+
+Une vente qui passe à COMPLETED ajoute sa contribution, une vente qui la
+quitte (annulation, suppression) la retire, une vente complétée modifiée
+remplace l'ancienne par la nouvelle. Les rapports lisent ces tables
+au lieu de parcourir sales / sale_lines.
+
+Modifications et suppressions passent par les signaux de Sale (API comme
+admin) ; les créations (checkout, sync) et les UPDATE ensemblistes
+(confirm_order) appellent apply() eux-mêmes, une fois les lignes en base.
+"""
+from datetime import datetime, time, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from sfs_sales.models import ProductSalesRollup, Sale, SaleLine, SalesRollup
+
+SALES_KEY = ('day', 'location_id', 'channel', 'payment_method')
+SALES_VALUES = ('sales_count', 'items_count', 'revenue', 'vat_amount')
+PRODUCT_KEY = ('day', 'location_id', 'channel', 'product_id')
+PRODUCT_VALUES = ('lines_count', 'quantity', 'revenue')
+CENT = Decimal('0.01')
+# Champs d'une vente qui déterminent sa contribution
+SALE_FIELDS = ('status', 'created_at', 'location_id', 'channel', 'payment_method', 'total', 'vat_amount')
+
+
+def sale_day(sale):
+    return timezone.localdate(sale.created_at)
+
+
+def revenue_amount(quantity, unit_price, discount_percent, vat_rate):
+    """CA TTC d'une ligne arrondi au centime (ROUND_HALF_UP) : seule règle d'arrondi des agrégats"""
+    amount = quantity * unit_price * (100 - discount_percent) * (100 + vat_rate) / 10000
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def line_revenue(line):
+    return revenue_amount(line.quantity, line.unit_price, line.discount_percent, line.vat_rate)
+
+
+def collect(baskets, sign=1):
+    """Contributions de (vente, lignes) aux deux tables d'agrégats"""
+    sales, products = {}, {}
+    for sale, lines in baskets:
+        day = sale_day(sale)
+        key = (day, sale.location_id, sale.channel, sale.payment_method)
+        row = sales.setdefault(key, dict.fromkeys(SALES_VALUES, 0))
+        row['sales_count'] += sign
+        row['items_count'] += sign * len(lines)
+        row['revenue'] += sign * Decimal(sale.total)
+        row['vat_amount'] += sign * Decimal(sale.vat_amount)
+        for line in lines:
+            key = (day, sale.location_id, sale.channel, line.product_id)
+            row = products.setdefault(key, dict.fromkeys(PRODUCT_VALUES, 0))
+            row['lines_count'] += sign
+            row['quantity'] += sign * line.quantity
+            row['revenue'] += sign * line_revenue(line)
+    return sales, products
+
+
+def increment(model, key_fields, value_fields, deltas):
+    """Ajoute des deltas aux lignes d'agrégats, créées au besoin.
+
+    Un INSERT ... ON CONFLICT DO UPDATE (SQLite, PostgreSQL) par table, découpé
+    seulement à la limite de paramètres de la base : le nombre de requêtes ne
+    dépend pas de la taille du panier. Clés triées, pour que deux transactions
+    concurrentes verrouillent les lignes dans le même ordre.
+    """
+    if not deltas:
+        return
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    fields = [model._meta.get_field(name) for name in (*key_fields, *value_fields)]
+    columns = [quote(field.column) for field in fields]
+    value_columns = columns[len(key_fields):]
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {{rows}} "
+        f"ON CONFLICT ({', '.join(columns[:len(key_fields)])}) DO UPDATE SET "
+        + ', '.join(f'{column} = {table}.{column} + EXCLUDED.{column}' for column in value_columns)
+    )
+    placeholder = f"({', '.join(['%s'] * len(fields))})"
+    rows = [
+        [field.get_db_prep_save(value, connection) for field, value in zip(
+            fields, (*key, *(deltas[key][name] for name in value_fields)),
+        )]
+        for key in sorted(deltas)
+    ]
+    per_query = len(rows)
+    if connection.features.max_query_params:
+        per_query = max(1, connection.features.max_query_params // len(fields))
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), per_query):
+            chunk = rows[start:start + per_query]
+            cursor.execute(
+                sql.format(rows=', '.join([placeholder] * len(chunk))),
+                [param for row in chunk for param in row],
+            )
+
+
+def apply(baskets, sign=1):
+    """Reporte des ventes complétées (sign=1) ou retirées (sign=-1) dans les agrégats"""
+    sales, products = collect(baskets, sign)
+    increment(SalesRollup, SALES_KEY, SALES_VALUES, sales)
+    increment(ProductSalesRollup, PRODUCT_KEY, PRODUCT_VALUES, products)
+
+
+def updated(before, sale):
+    """À appeler après la modification d'une vente, before étant sa copie d'avant l'enregistrement.
+
+    Retire l'ancienne contribution et ajoute la nouvelle : un changement de
+    statut, mais aussi de montant, de lieu, de canal ou de moyen de paiement
+    déplace la vente dans les agrégats.
+    """
+    if all(getattr(before, field) == getattr(sale, field) for field in SALE_FIELDS):
+        return
+    lines = list(sale.lines.all())
+    deltas = [
+        collect([(state, lines)], sign)
+        for state, sign in ((before, -1), (sale, 1)) if state.status == 'COMPLETED'
+    ]
+    for index, (model, key_fields, value_fields) in enumerate((
+        (SalesRollup, SALES_KEY, SALES_VALUES), (ProductSalesRollup, PRODUCT_KEY, PRODUCT_VALUES),
+    )):
+        merged = {}
+        for delta in deltas:
+            for key, row in delta[index].items():
+                total = merged.setdefault(key, dict.fromkeys(value_fields, 0))
+                for field in value_fields:
+                    total[field] += row[field]
+        # Clés inchangées (ex. produits d'une vente dont seul le paiement change) : rien à écrire
+        merged = {key: row for key, row in merged.items() if any(row.values())}
+        increment(model, key_fields, value_fields, merged)
+
+
+def removed(sale):
+    """À appeler avant la suppression d'une vente"""
+    if sale.status == 'COMPLETED':
+        apply([(sale, list(sale.lines.all()))], sign=-1)
+
+
+def rebuild(start=None, end=None):
+    """Recalcule les agrégats des jours [start, end] depuis les ventes brutes.
+
+    Traite un mois à la fois, chacun dans sa propre transaction, pour ne pas
+    verrouiller les tables pendant toute la reconstruction.
+    """
+    completed = Sale.objects.filter(status='COMPLETED').order_by()
+    if start is None and end is None:
+        SalesRollup.objects.all().delete()
+        ProductSalesRollup.objects.all().delete()
+    if start is None:
+        first = completed.order_by('created_at').values_list('created_at', flat=True).first()
+        if first is None:
+            return 0
+        start = timezone.localdate(first)
+    end = end or timezone.localdate()
+
+    rebuilt = 0
+    chunk_start = start
+    while chunk_start <= end:
+        next_month = (chunk_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        chunk_end = min(end, next_month - timedelta(days=1))
+        with transaction.atomic():
+            rebuilt += rebuild_days(completed, chunk_start, chunk_end)
+        chunk_start = chunk_end + timedelta(days=1)
+    return rebuilt
+
+
+def day_bounds(start, end):
+    """Jours locaux [start, end] en bornes created_at (utilise l'index)"""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+def rebuild_days(completed, start, end):
+    SalesRollup.objects.filter(day__range=(start, end)).delete()
+    ProductSalesRollup.objects.filter(day__range=(start, end)).delete()
+    lower, upper = day_bounds(start, end)
+
+    items = (
+        SaleLine.objects.filter(sale=OuterRef('pk'))
+        .order_by().values('sale').annotate(n=Count('pk')).values('n')
+    )
+    sales = (
+        completed.filter(created_at__gte=lower, created_at__lt=upper)
+        .annotate(day=TruncDate('created_at'))
+        .annotate(items=Coalesce(Subquery(items, output_field=IntegerField()), 0))
+        .values(*SALES_KEY)
+        .annotate(
+            sales_count=Count('pk'), items_count=Sum('items'),
+            revenue=Sum('total'), vat_amount_sum=Sum('vat_amount'),
+        )
+    )
+    rows = [
+        SalesRollup(
+            day=row['day'], location_id=row['location_id'], channel=row['channel'],
+            payment_method=row['payment_method'], sales_count=row['sales_count'],
+            items_count=row['items_count'], revenue=row['revenue'],
+            vat_amount=row['vat_amount_sum'],
+        )
+        for row in sales
+    ]
+    SalesRollup.objects.bulk_create(rows, batch_size=500)
+
+    # Par produit : arrondi de chaque ligne en Python, comme à l'encaissement
+    # (un ROUND SQL en flottants peut différer d'un centime)
+    lines = (
+        SaleLine.objects.filter(
+            sale__status='COMPLETED', sale__created_at__gte=lower, sale__created_at__lt=upper,
+        )
+        .order_by()
+        .values_list(
+            'sale__created_at', 'sale__location_id', 'sale__channel', 'product_id',
+            'quantity', 'unit_price', 'discount_percent', 'vat_rate',
+        )
+    )
+    products = {}
+    for created_at, location_id, channel, product_id, quantity, *prices in lines.iterator(chunk_size=2000):
+        key = (timezone.localdate(created_at), location_id, channel, product_id)
+        row = products.setdefault(key, dict.fromkeys(PRODUCT_VALUES, 0))
+        row['lines_count'] += 1
+        row['quantity'] += quantity
+        row['revenue'] += revenue_amount(quantity, *prices)
+    product_rows = [
+        ProductSalesRollup(**dict(zip(PRODUCT_KEY, key)), **row) for key, row in products.items()
+    ]
+    ProductSalesRollup.objects.bulk_create(product_rows, batch_size=500)
+    return len(rows)
@@ -0,0 +1,26 @@
+# sfs_sales/signals.py
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from sfs_sales import rollups
+from sfs_sales.models import Sale
+
+
+@receiver(pre_save, sender=Sale, dispatch_uid='rollups_sale_before')
+def remember_saved_sale(sender, instance, raw=False, **kwargs):
+    # Version en base, pour retirer son ancienne contribution après l'enregistrement
+    instance._rollups_before = None
+    if instance.pk is not None and not raw:
+        instance._rollups_before = Sale.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Sale, dispatch_uid='rollups_sale')
+def move_sale_contribution(sender, instance, **kwargs):
+    before = getattr(instance, '_rollups_before', None)
+    if before is not None:
+        rollups.updated(before, instance)
+
+
+@receiver(pre_delete, sender=Sale, dispatch_uid='rollups_sale_delete')
+def remove_sale_contribution(sender, instance, **kwargs):
+    rollups.removed(instance)
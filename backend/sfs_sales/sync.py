@@ -0,0 +1,99 @@
+# sfs_sales/sync.py
+"""Intégration en lot des ventes saisies hors ligne par le POS.
+
+Chaque vente porte une clé d'idempotence générée par le client : un envoi
+rejoué ne crée pas de doublon, même si deux synchronisations se croisent.
+"""
+import uuid
+
+from django.db import transaction
+
+from sfs_sales import numbering, rollups
+from sfs_sales.checkout import build_lines, credit_loyalty, decrement_stocks, set_totals
+from sfs_sales.models import Sale, SaleLine
+
+ACCEPTED = 'accepted'
+DUPLICATE = 'duplicate'
+REJECTED = 'rejected'
+
+
+KEY_MAX_LENGTH = Sale._meta.get_field('idempotency_key').max_length
+
+
+def new_key():
+    return uuid.uuid4().hex
+
+
+def key_error(key):
+    """Motif de refus d'une clé fournie par le client, None si elle est valide"""
+    if not isinstance(key, str) or not key.strip():
+        return "La clé d'idempotence doit être une chaîne non vide"
+    if len(key) > KEY_MAX_LENGTH:
+        return f"La clé d'idempotence ne doit pas dépasser {KEY_MAX_LENGTH} caractères"
+    return None
+
+
+def existing_keys(keys):
+    """{clé: numéro de vente} des clés déjà intégrées (1 requête)"""
+    return dict(
+        Sale.objects.filter(idempotency_key__in=keys).values_list('idempotency_key', 'sale_number')
+    )
+
+
+def ingest(batch):
+    """Insère en bulk une liste de (clé, données validées).
+
+    Retourne {clé: (statut, vente ou numéro de vente)}. Les ventes déjà
+    présentes (y compris insérées entre-temps par une synchro concurrente)
+    sont signalées en doublon.
+    """
+    if not batch:
+        return {}
+
+    sales, baskets = [], []
+    for key, data in batch:
+        data = dict(data)
+        lines_data = data.pop('lines')
+        sale = Sale(idempotency_key=key, synced=True, is_paid=True, status='COMPLETED', **data)
+        lines = build_lines(sale, lines_data)
+        set_totals(sale, lines)
+        sales.append(sale)
+        baskets.append((sale, lines))
+
+    # Numéros réservés par (lieu, canal) avant d'ouvrir la transaction
+    groups = {}
+    for sale in sales:
+        groups.setdefault((sale.location_id, sale.channel), []).append(sale)
+    for (location_id, channel), group in groups.items():
+        for sale, number in zip(group, numbering.allocator.allocate(location_id, channel, len(group))):
+            sale.sale_number = number
+
+    with transaction.atomic():
+        return _insert(sales, baskets)
+
+
+def _insert(sales, baskets):
+    results = {}
+    Sale.objects.bulk_create(sales, ignore_conflicts=True)
+    inserted = dict(
+        Sale.objects.filter(sale_number__in=[sale.sale_number for sale in sales])
+        .values_list('sale_number', 'pk')
+    )
+
+    accepted = []
+    for sale, lines in baskets:
+        sale.pk = inserted.get(sale.sale_number)
+        if sale.pk is None:
+            results[sale.idempotency_key] = (DUPLICATE, None)
+            continue
+        for line in lines:
+            line.sale = sale
+        accepted.append((sale, lines))
+        results[sale.idempotency_key] = (ACCEPTED, sale)
+
+    SaleLine.objects.bulk_create([line for _, lines in accepted for line in lines])
+    # Les ventes hors ligne ont déjà eu lieu : la survente est acceptée
+    decrement_stocks(accepted, oversell=True)
+    credit_loyalty([sale for sale, _ in accepted])
+    rollups.apply(accepted)
+    return results
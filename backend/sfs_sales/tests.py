@@ -0,0 +1,151 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from sfs_customers.models import Customer, LoyaltyCard
+from sfs_inventory.models import Stock, StockLocation
+from sfs_products.models import Product, ProductCategory
+from sfs_sales import rollups
+from sfs_sales.checkout import checkout
+from sfs_sales.models import ProductSalesRollup, SalesRollup
+
+LARGE_BASKET = 45
+
+
+class SaleQueryCountTests(TestCase):
+    """Le nombre de requêtes ne dépend ni de la taille du panier ni de celle de la page"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Fruits')
+        cls.location = StockLocation.objects.create(code='STAND', name='Stand')
+        cls.products = Product.objects.bulk_create([
+            Product(code=f'P{i}', name=f'Pomme {i}', category=category, base_price=Decimal('2.50'))
+            for i in range(LARGE_BASKET)
+        ])
+        Stock.objects.bulk_create([
+            Stock(product=product, location=cls.location, quantity=Decimal('1000')) for product in cls.products
+        ])
+        cls.customer = Customer.objects.create(first_name='Jean', last_name='Dupont', email='jean@example.com')
+        LoyaltyCard.objects.create(customer=cls.customer, card_number='C0001')
+
+    def sell(self, size):
+        basket = [{'product': product, 'quantity': Decimal('1')} for product in self.products[:size]]
+        return checkout(basket, channel='KIOSK', location=self.location, payment_method='CASH', customer=self.customer)
+
+    def count_checkout(self, size):
+        # Premier encaissement : lignes d'agrégats et bloc de numéros créés
+        self.sell(size)
+        with CaptureQueriesContext(connection) as queries:
+            self.sell(size)
+        return len(queries)
+
+    def test_checkout_queries_do_not_grow_with_basket(self):
+        one_line = self.count_checkout(1)
+        self.assertEqual(self.count_checkout(LARGE_BASKET), one_line)
+
+    def test_sales_list_queries_do_not_grow_with_page_size(self):
+        for _ in range(50):
+            self.sell(2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/sales/', {'page_size': 1})
+        self.assertEqual(len(response.json()['results']), 1)
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get('/api/sales/', {'page_size': 50})
+        self.assertEqual(len(response.json()['results']), 50)
+
+
+class SaleRollupSignalTests(TestCase):
+    """Une vente modifiée ou supprimée hors API (admin) garde les agrégats égaux à une reconstruction"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Fruits')
+        cls.location = StockLocation.objects.create(code='STAND', name='Stand')
+        cls.products = Product.objects.bulk_create([
+            Product(code=f'P{i}', name=f'Pomme {i}', category=category, base_price=Decimal('0.35'))
+            for i in range(3)
+        ])
+        Stock.objects.bulk_create([
+            Stock(product=product, location=cls.location, quantity=Decimal('1000')) for product in cls.products
+        ])
+
+    def sell(self, quantity):
+        basket = [{'product': product, 'quantity': Decimal(quantity)} for product in self.products]
+        return checkout(basket, channel='KIOSK', location=self.location, payment_method='CASH')
+
+    def snapshot(self):
+        # Les lignes vidées par un retrait restent à zéro, une reconstruction ne les recrée pas
+        return (
+            sorted(SalesRollup.objects.exclude(sales_count=0).values_list(*rollups.SALES_KEY, *rollups.SALES_VALUES)),
+            sorted(ProductSalesRollup.objects.exclude(lines_count=0).values_list(*rollups.PRODUCT_KEY, *rollups.PRODUCT_VALUES)),
+        )
+
+    def assertRollupsRebuilt(self):
+        live = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(live, self.snapshot())
+
+    def test_save_and_delete_outside_api(self):
+        kept, moved, cancelled = self.sell('1.333'), self.sell('3'), self.sell('2')
+        moved.payment_method = 'CARD'
+        moved.save()
+        cancelled.status = 'CANCELLED'
+        cancelled.save()
+        kept.delete()
+        self.assertRollupsRebuilt()
+
+
+class PendingOrderUpdateTests(TestCase):
+    """Une commande web ne se complète que par l'action confirm"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Fruits')
+        cls.location = StockLocation.objects.create(code='WEB', name='Boutique')
+        cls.product = Product.objects.create(code='P0', name='Pomme', category=category, base_price=Decimal('2.50'))
+        Stock.objects.create(product=cls.product, location=cls.location, quantity=Decimal('10'))
+
+    def setUp(self):
+        basket = [{'product': self.product, 'quantity': Decimal('2')}]
+        self.sale = checkout(basket, channel='WEB', location=self.location, payment_method='ONLINE')
+
+    def test_patch_cannot_complete_pending_order(self):
+        for status in ('COMPLETED', 'CONFIRMED'):
+            response = self.client.patch(
+                f'/api/sales/{self.sale.pk}/', {'status': status}, content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 400)
+        self.sale.refresh_from_db()
+        self.assertEqual(self.sale.status, 'PENDING')
+
+    def test_confirm_action_completes_order(self):
+        response = self.client.post(f'/api/sales/{self.sale.pk}/confirm/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['status'], response.json()['is_paid']), ('COMPLETED', True))
+        self.assertEqual(SalesRollup.objects.get().sales_count, 1)
+
+
+class RefundLoyaltyTests(TestCase):
+    """Un remboursement au nom d'un porteur de carte ne crédite ni ne débite de points"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Fruits')
+        cls.location = StockLocation.objects.create(code='STAND', name='Stand')
+        cls.product = Product.objects.create(code='P0', name='Pomme', category=category, base_price=Decimal('2.50'))
+        Stock.objects.create(product=cls.product, location=cls.location, quantity=Decimal('10'))
+        cls.customer = Customer.objects.create(first_name='Jean', last_name='Dupont', email='jean@example.com')
+        cls.card = LoyaltyCard.objects.create(customer=cls.customer, card_number='C0001')
+
+    def test_refund_sale_is_accepted(self):
+        response = self.client.post('/api/sales/', {
+            'channel': 'KIOSK', 'location': self.location.pk, 'customer': self.customer.pk,
+            'payment_method': 'CASH', 'lines': [{'product': self.product.pk, 'quantity': '-2', 'unit_price': '2.50', 'vat_rate': '5.50'}],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.card.refresh_from_db()
+        self.assertEqual(self.card.points_balance, 0)
+        self.assertFalse(self.card.transactions.exists())
@@ -54,11 +54,81 @@ TEMPLATES = [{
 
 WSGI_APPLICATION = 'verger.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Base de données : SQLite par défaut (poste de dev, petit stand),
+# PostgreSQL en production avec DB_ENGINE=postgresql
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE == 'postgresql':
+    # Derrière PgBouncer (mode transaction) : pas de curseurs serveur ni de
+    # paramètres de démarrage, qu'il ne transmet pas
+    DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', 'False') == 'True'
+    DB_OPTIONS = {
+        'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+        'application_name': os.getenv('DB_APPLICATION_NAME', 'verger'),
+    }
+    if not DB_PGBOUNCER:
+        DB_OPTIONS['options'] = '-c statement_timeout=%s' % os.getenv('DB_STATEMENT_TIMEOUT', '30000')
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'verger'),
+            'USER': os.getenv('DB_USER', 'verger'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            # Connexions persistantes, vérifiées avant chaque réutilisation
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+            'OPTIONS': DB_OPTIONS,
+        }
+    }
+else:
+    # Backend SQLite réglé pour les écritures concurrentes (voir verger/sqlite/base.py).
+    # WAL sur demande : il ajoute les fichiers -wal / -shm à côté de la base et
+    # laisse le db.sqlite3 de démo versionné modifié
+    SQLITE_WAL = os.getenv('SQLITE_WAL', 'False') == 'True'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'verger.sqlite',
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'journal_mode': 'WAL' if SQLITE_WAL else None,
+                # NORMAL n'est sûr qu'en WAL
+                'synchronous': 'NORMAL' if SQLITE_WAL else None,
+                'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000')),
+                'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', '-16000')),
+                'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(64 * 1024 * 1024))),
+            },
+        }
     }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Réponses du catalogue (voir sfs_products/catalogue.py) ; en production
+    # multi-workers, un cache partagé (Redis, Memcached) pour l'invalidation
+    'catalogue': {
+        'BACKEND': os.getenv('CATALOGUE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CATALOGUE_CACHE_LOCATION', 'catalogue'),
+        'TIMEOUT': int(os.getenv('CATALOGUE_CACHE_TIMEOUT', '3600')),
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+    # Cartes fidélité scannées en caisse (voir sfs_customers/cards.py)
+    'cards': {
+        'BACKEND': os.getenv('CARDS_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CARDS_CACHE_LOCATION', 'cards'),
+        'TIMEOUT': int(os.getenv('CARDS_CACHE_TIMEOUT', '300')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CARDS_CACHE_SIZE', '20000'))},
+    },
+    # Profils /customers/me/ de la boutique (voir sfs_customers/profiles.py)
+    'profiles': {
+        'BACKEND': os.getenv('PROFILES_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('PROFILES_CACHE_LOCATION', 'profiles'),
+        'TIMEOUT': int(os.getenv('PROFILES_CACHE_TIMEOUT', '300')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('PROFILES_CACHE_SIZE', '20000'))},
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = []
@@ -116,7 +186,11 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+SALE_NUMBER_BLOCK_SIZE = int(os.getenv('SALE_NUMBER_BLOCK_SIZE', '20'))
 LOYALTY_POINTS_MULTIPLIER = 1
 LOYALTY_DISCOUNT_THRESHOLD = 100
 LOW_STOCK_THRESHOLD = 10
+STOCK_ALLOW_OVERSELL = os.getenv('STOCK_ALLOW_OVERSELL', 'True') == 'True'
+# Durée (minutes) pendant laquelle une commande web en attente retient son stock
+STOCK_RESERVATION_TTL = int(os.getenv('STOCK_RESERVATION_TTL', '30'))
 RGPD_DATA_RETENTION_DAYS = 1095
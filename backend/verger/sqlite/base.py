@@ -0,0 +1,48 @@
+# verger/sqlite/base.py
+"""Backend SQLite réglé pour plusieurs caisses sur un même stand.
+
+Par rapport au backend Django :
+- journal WAL : les lectures ne bloquent plus l'écriture, et inversement ;
+- busy_timeout : une caisse attend le verrou au lieu d'échouer ;
+- synchronous=NORMAL : sans risque de corruption en WAL, beaucoup moins de fsync ;
+- cache et mmap agrandis ;
+- BEGIN IMMEDIATE : une transaction prend le verrou d'écriture dès le début.
+  Avec le BEGIN par défaut, deux transactions qui lisent puis écrivent se
+  bloquent mutuellement et l'une échoue aussitôt avec « database is locked »,
+  sans attendre busy_timeout.
+
+Chaque réglage se surcharge dans DATABASES['default']['OPTIONS'] (None le
+désactive).
+"""
+from django.db.backends.sqlite3 import base
+
+DEFAULTS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,            # ms
+    'cache_size': -16000,            # négatif : en Kio
+    'mmap_size': 64 * 1024 * 1024,   # octets
+    'transaction_mode': 'IMMEDIATE',
+}
+PRAGMAS = ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Options propres à ce backend : sqlite3.connect() ne les accepte pas
+        self.tuning = {key: params.pop(key, default) for key, default in DEFAULTS.items()}
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma in PRAGMAS:
+            value = self.tuning[pragma]
+            if value is not None:
+                conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.tuning['transaction_mode']
+        self.cursor().execute(f"BEGIN {mode}" if mode else "BEGIN")
@@ -0,0 +1,22 @@
+# verger/text.py
+"""Normalisation du texte pour la recherche : casse et accents repliés.
+
+« Pêches », « PECHES » et « peches » donnent tous « peches ».
+"""
+import re
+import unicodedata
+
+WORD = re.compile(r'[a-z0-9]+')
+# Ligatures que NFKD ne décompose pas
+LIGATURES = str.maketrans({'œ': 'oe', 'Œ': 'OE', 'æ': 'ae', 'Æ': 'AE', 'ß': 'ss'})
+
+
+def fold(value):
+    """Minuscules, sans accents ni ligatures (œ -> oe)"""
+    value = unicodedata.normalize('NFKD', str(value or '').translate(LIGATURES))
+    return ''.join(char for char in value if not unicodedata.combining(char)).lower()
+
+
+def words(value):
+    """Mots repliés de value, dans l'ordre"""
+    return WORD.findall(fold(value))
@@ -6,9 +6,10 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 # Importer depuis sfs_customers/views.py au lieu de api_complete.py
 from sfs_customers.views import (
     ProductViewSet, ProductCategoryViewSet,
-    StockViewSet, StockLocationViewSet,
+    StockViewSet, StockLocationViewSet, StockMovementViewSet,
     CustomerViewSet, LoyaltyCardViewSet,
-    SaleViewSet, DailyReportViewSet
+    SaleViewSet, DailyReportViewSet,
+    catalogue_delta, health,
 )
 
 router = routers.DefaultRouter()
@@ -16,6 +17,7 @@ router.register(r'products/categories', ProductCategoryViewSet, basename='catego
 router.register(r'products', ProductViewSet, basename='product')
 router.register(r'inventory/locations', StockLocationViewSet, basename='location')
 router.register(r'inventory/stocks', StockViewSet, basename='stock')
+router.register(r'inventory/movements', StockMovementViewSet, basename='movement')
 router.register(r'customers', CustomerViewSet, basename='customer')
 router.register(r'loyalty', LoyaltyCardViewSet, basename='loyalty')
 router.register(r'sales', SaleViewSet, basename='sale')
@@ -25,5 +27,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/token/', TokenObtainPairView.as_view()),
     path('api/auth/token/refresh/', TokenRefreshView.as_view()),
+    path('api/health/', health),
+    path('api/sync/catalogue/', catalogue_delta),
     path('api/', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { ShoppingCart, LogOut, CreditCard, Banknote, Trash2, X } from 'lucide-react'
-import { api } from './api/client'
+import { api, mergeCatalogue } from './api/client'
 
 
 function App() {
@@ -34,15 +34,15 @@ function App() {
     }
   }
 
-  // Charger les données
+  // Charger les données : catalogue gardé en local, seules les modifications sont téléchargées
   const loadData = async () => {
     try {
-      const [productsData, categoriesData] = await Promise.all([
-        api.products.getAll(),
-        api.categories.getAll()
-      ])
-      setProducts(Array.isArray(productsData) ? productsData : [])
-      setCategories(Array.isArray(categoriesData) ? categoriesData : [])
+      const cached = JSON.parse(localStorage.getItem('catalogue') || 'null')
+      const delta = await api.sync.catalogue(cached?.watermark)
+      const catalogue = mergeCatalogue(cached, delta)
+      localStorage.setItem('catalogue', JSON.stringify(catalogue))
+      setProducts(catalogue.products)
+      setCategories(catalogue.categories)
     } catch (error) {
       console.error('Erreur chargement données:', error)
       alert('Erreur de chargement des données')
@@ -86,9 +86,9 @@ function App() {
     
     setLoading(true)
     try {
-      const data = await api.customers.searchByCard(customerCard, token)
+      const data = await api.customers.scan(customerCard.trim(), token)
       setCustomer(data)
-      alert(`Client trouvé: ${data.first_name} ${data.last_name}`)
+      alert(`Client trouvé: ${data.customer.full_name}`)
     } catch (error) {
       alert('Carte non trouvée')
       setCustomer(null)
@@ -316,7 +316,7 @@ const handlePayment = async (method) => {
                 <div className="flex items-center justify-between">
                   <div>
                     <p className="font-medium text-green-800">
-                      {customer.first_name} {customer.last_name}
+                      {customer.customer.full_name}
                     </p>
                     <p className="text-sm text-green-600">
                       Points: {customer.loyalty_card?.points_balance || 0}
@@ -452,7 +452,7 @@ const handlePayment = async (method) => {
               
               <div className="text-xs mt-2">
                 <p>Mode: {lastSale.payment_method === 'CASH' ? 'ESPÈCES' : 'CARTE'}</p>
-                {customer && <p>Client: {customer.first_name} {customer.last_name}</p>}
+                {customer && <p>Client: {customer.customer.full_name}</p>}
               </div>
 
               <div className="text-center mt-6 italic text-xs">
@@ -34,8 +34,24 @@ export const api = {
     },
   },
   
+  // Synchronisation différentielle (catalogue et stocks)
+  sync: {
+    catalogue: async (since) => {
+      const response = await apiClient.get('/sync/catalogue/', { params: since ? { since } : {} })
+      return response.data
+    },
+  },
+  
   // Clients
   customers: {
+    // Scan en caisse : réponse compacte, servie depuis le cache des cartes récentes
+    scan: async (cardNumber, token) => {
+      const response = await apiClient.get(
+        `/customers/scan/${encodeURIComponent(cardNumber)}/`,
+        { headers: { Authorization: `Bearer ${token}` } }
+      )
+      return response.data
+    },
     searchByCard: async (cardNumber, token) => {
       const response = await apiClient.post(
         '/customers/search_by_card/',
@@ -57,4 +73,20 @@ export const api = {
   },
 }
 
+// Applique une réponse de /sync/catalogue/ au catalogue gardé en local
+export const mergeCatalogue = (cached, delta) => {
+  const merge = (rows, changed, deleted) => {
+    const byId = new Map((delta.full ? [] : rows || []).map(row => [row.id, row]))
+    changed.forEach(row => byId.set(row.id, row))
+    deleted.forEach(id => byId.delete(id))
+    return [...byId.values()]
+  }
+  return {
+    watermark: delta.watermark,
+    products: merge(cached?.products, delta.products, delta.deleted.products),
+    categories: merge(cached?.categories, delta.categories, delta.deleted.categories),
+    stocks: merge(cached?.stocks, delta.stocks, delta.deleted.stocks),
+  }
+}
+
 export default apiClient
@@ -54,6 +54,8 @@ products: {
     const response = await apiClient.get('/products/in_season/')
     return { data: response.data.results || response.data }  // 👈 Ajoute ça
   },
+  search: (q, params) =>
+    apiClient.get('/products/search/', { params: { q, ...params } }),
   getById: (id) =>
     apiClient.get(`/products/${id}/`),
   getByCategory: async (categoryId) => {
@@ -106,6 +108,12 @@ sales: {
   },
   getById: (id) =>
     apiClient.get(`/sales/${id}/`),
+  // Commande web payée : le stock réservé sort du stock
+  confirm: (id) =>
+    apiClient.post(`/sales/${id}/confirm/`),
+  // Commande web abandonnée : le stock réservé est libéré
+  cancel: (id) =>
+    apiClient.post(`/sales/${id}/cancel/`),
 },
   
   // Abonnements
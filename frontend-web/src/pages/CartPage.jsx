@@ -51,7 +51,15 @@ export default function CartPage() {
         console.log('📦 Order data:', orderData) // 👈 Ajoute ça
 
 
+      // La commande web est créée en attente, stock réservé : le paiement la confirme
       const response = await api.sales.create(orderData)
+      try {
+        await api.sales.confirm(response.data.id)
+      } catch (err) {
+        // Paiement non abouti : on libère le stock réservé
+        await api.sales.cancel(response.data.id).catch(() => {})
+        throw err
+      }
 
       success('Commande passée avec succès !')
       clearCart()
@@ -62,7 +70,7 @@ export default function CartPage() {
 
     } catch (err) {
       console.error('Erreur lors de la commande:', err)
-      showError(err.response?.data?.detail || 'Erreur lors de la commande')
+      showError(err.response?.data?.error || err.response?.data?.detail || 'Erreur lors de la commande')
     } finally {
       setLoading(false)
     }
@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react'
-import { Plus, Minus, ShoppingCart } from 'lucide-react'
+import { Plus, Minus, ShoppingCart, Search } from 'lucide-react'
 import { api } from '../api/client'
 import useCartStore from '../stores/cartStore'
 import { useToast } from '../components/Toaster'
@@ -9,6 +9,8 @@ export default function ShopPage() {
   const [categories, setCategories] = useState([])
   const [loading, setLoading] = useState(true)
   const [selectedCategory, setSelectedCategory] = useState(null)
+  const [query, setQuery] = useState('')
+  const [results, setResults] = useState(null)
   
   const { addItem } = useCartStore()
   const { success } = useToast()
@@ -17,6 +19,27 @@ export default function ShopPage() {
     loadData()
   }, [])
   
+  // Recherche au fil de la frappe : 2 caractères minimum, requête envoyée après 200 ms sans frappe
+  useEffect(() => {
+    if (query.trim().length < 2) {
+      setResults(null)
+      return
+    }
+    let cancelled = false
+    const timer = setTimeout(async () => {
+      try {
+        const response = await api.products.search(query, { limit: 50 })
+        if (!cancelled) setResults(Array.isArray(response.data) ? response.data : [])
+      } catch (error) {
+        console.error('Erreur:', error)
+      }
+    }, 200)
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [query])
+  
   const loadData = async () => {
     try {
       const [productsRes, categoriesRes] = await Promise.all([
@@ -36,9 +59,10 @@ export default function ShopPage() {
     }
   }
   
+  const shownProducts = results ?? products
   const filteredProducts = selectedCategory
-    ? products.filter(p => p.category?.id === selectedCategory)
-    : products
+    ? shownProducts.filter(p => p.category?.id === selectedCategory)
+    : shownProducts
   
   const handleAddToCart = (product) => {
     addItem(product, 1)
@@ -58,6 +82,18 @@ export default function ShopPage() {
       <div className="container mx-auto px-4">
         <h1 className="text-4xl font-bold text-gray-900 mb-8">Notre Boutique</h1>
         
+        {/* Recherche */}
+        <div className="relative mb-6 max-w-md">
+          <Search className="absolute left-3 top-1/2 -translate-y-1/2 h-5 w-5 text-gray-400" />
+          <input
+            type="search"
+            value={query}
+            onChange={(e) => setQuery(e.target.value)}
+            placeholder="Rechercher un produit (pêches, céleri...)"
+            className="w-full pl-10 pr-4 py-2 rounded-lg border bg-white focus:outline-none focus:ring-2 focus:ring-green-500"
+          />
+        </div>
+        
         {/* Catégories */}
         <div className="flex gap-2 mb-8 overflow-x-auto">
           <button
@@ -88,8 +124,14 @@ export default function ShopPage() {
         {/* Produits */}
         {filteredProducts.length === 0 ? (
           <div className="text-center py-16">
-            <p className="text-gray-500 text-lg">Aucun produit disponible</p>
-            <p className="text-sm text-gray-400 mt-2">Ajoutez des produits dans l'admin Django</p>
+            {results ? (
+              <p className="text-gray-500 text-lg">Aucun produit ne correspond à « {query} »</p>
+            ) : (
+              <>
+                <p className="text-gray-500 text-lg">Aucun produit disponible</p>
+                <p className="text-sm text-gray-400 mt-2">Ajoutez des produits dans l'admin Django</p>
+              </>
+            )}
           </div>
         ) : (
           <div className="grid sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">